@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from .db import get_conn, get_write_conn
+from .utils import json_dump, json_load, now_utc
+
+logger = logging.getLogger("smartdeals.config")
+
+
+class _Section(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+
+class CrawlerConfig(_Section):
+    enabled: bool = False
+    page_size: int = 50
+    max_pages: int = 5
+    max_offset: int = 1000
+
+
+class PriceTrackingConfig(_Section):
+    heartbeat_hours: float = 24
+    rescore_threshold_percent: float = 5
+    refresh_statuses: list[str] = Field(default_factory=lambda: ["pending_approval", "approved"])
+    refresh_posted_days: float = 7
+    refresh_min_minutes: float = Field(15, gt=0)
+    refresh_max_minutes: float = Field(1440, gt=0)
+    refresh_max_items: int = Field(2000, ge=0)
+
+
+class DedupConfig(_Section):
+    near_duplicates: bool = True
+    similarity_threshold: float = Field(0.8, ge=0, le=1)
+    window_days: int = 30
+
+
+class MercadoLivreConfig(_Section):
+    client_id: str = ""
+    client_secret: str = ""
+    redirect_uri: str = ""
+    refresh_token: str = ""
+    access_token: str = ""
+
+
+class AmazonConfig(_Section):
+    pa_api_access_key: str = ""
+    pa_api_secret: str = ""
+    partner_tag: str = ""
+    region: str = "BR"
+    pa_api_endpoint: str = ""
+    pa_api_max_requests: int = Field(30, ge=0)
+    manual_links: list[str] = Field(default_factory=list)
+    probe_max_bytes: int = Field(600_000, ge=16_384)
+    scrape_limit: int = Field(20, ge=0)
+
+
+class TelegramConfig(_Section):
+    bot_token: str = ""
+    chat_id: str = ""
+
+
+class WhatsAppConfig(_Section):
+    provider: str = "draft"
+    phone_number_id: str = ""
+    token: str = ""
+    to_numbers: list[str] = Field(default_factory=list)
+
+
+class BucketConfig(_Section):
+    rate: float = Field(1, gt=0)
+    burst: float = Field(1, ge=1)
+
+
+class RateLimitConfig(_Section):
+    # rate is requests per second; *_destination applies per chat / per WhatsApp number.
+    telegram: BucketConfig = Field(default_factory=lambda: BucketConfig(rate=30, burst=30))
+    telegram_destination: BucketConfig = Field(default_factory=lambda: BucketConfig(rate=1, burst=1))
+    whatsapp: BucketConfig = Field(default_factory=lambda: BucketConfig(rate=80, burst=80))
+    whatsapp_destination: BucketConfig = Field(default_factory=lambda: BucketConfig(rate=0.17, burst=10))
+    amazon_paapi: BucketConfig = Field(default_factory=lambda: BucketConfig(rate=1, burst=1))
+
+
+class AppConfig(_Section):
+    mode: Literal["MANUAL", "AUTO"] = "MANUAL"
+    approval_threshold: int = 70
+    categories_allowed: list[str] = Field(default_factory=lambda: ["gamer", "moda", "casa"])
+    blocked_words: list[str] = Field(default_factory=lambda: ["réplica", "usado", "seminovo"])
+    price_min: float = 10
+    price_max: float = 15000
+    min_discount_percent: float = 20
+    cooldown_days: int = 7
+    daily_post_limit: int = 15
+    seed_keywords: list[str] = Field(default_factory=lambda: ["RTX 5060", "Tênis New Balance"])
+    seed_categories: list[str] = Field(default_factory=list)
+    crawler: CrawlerConfig = Field(default_factory=CrawlerConfig)
+    price_tracking: PriceTrackingConfig = Field(default_factory=PriceTrackingConfig)
+    dedup: DedupConfig = Field(default_factory=DedupConfig)
+    mercadolivre: MercadoLivreConfig = Field(default_factory=MercadoLivreConfig)
+    amazon: AmazonConfig = Field(default_factory=AmazonConfig)
+    telegram: TelegramConfig = Field(default_factory=TelegramConfig)
+    whatsapp: WhatsAppConfig = Field(default_factory=WhatsAppConfig)
+    rate_limits: RateLimitConfig = Field(default_factory=RateLimitConfig)
+
+
+def default_config() -> dict:
+    return AppConfig().model_dump()
+
+
+class ConfigCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._payload: dict | None = None
+
+    def _set(self, version: int, model: AppConfig) -> dict:
+        self._version, self._payload = version, model.model_dump()
+        return self._payload
+
+    def _load(self) -> dict:
+        with get_conn() as conn:
+            row = conn.execute("SELECT payload, version FROM app_config WHERE id=1").fetchone()
+        if not row:
+            model = AppConfig()
+            with get_write_conn() as conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO app_config(id, payload, updated_at, version) VALUES (1, ?, ?, 1)",
+                    (json_dump(model.model_dump()), now_utc().isoformat()),
+                )
+                conn.commit()
+            return self._set(1, model)
+        raw = json_load(row["payload"], {})
+        try:
+            model = AppConfig.model_validate(raw)
+        except ValidationError as exc:
+            logger.warning("Stored config v%s does not match the schema, using it unvalidated: %s", row["version"], exc)
+            model = AppConfig.model_construct(**{**default_config(), **raw})
+        return self._set(row["version"], model)
+
+    def get(self) -> dict:
+        # The returned dict is shared by every caller; treat it as read-only.
+        payload = self._payload
+        if payload is not None:
+            return payload
+        with self._lock:
+            return self._payload if self._payload is not None else self._load()
+
+    def version(self) -> int:
+        self.get()
+        return self._version or 0
+
+    def save(self, payload: dict) -> dict:
+        with self._lock:
+            current = dict(self._payload if self._payload is not None else self._load())
+            current.update(payload)
+            model = AppConfig.model_validate(current)
+            with get_write_conn() as conn:
+                row = conn.execute(
+                    "UPDATE app_config SET payload=?, updated_at=?, version=version+1 WHERE id=1 RETURNING version",
+                    (json_dump(model.model_dump()), now_utc().isoformat()),
+                ).fetchone()
+                conn.commit()
+            return self._set(row["version"], model)
+
+
+config_cache = ConfigCache()
+
+
+def get_config() -> dict:
+    return config_cache.get()
+
+
+def config_version() -> int:
+    return config_cache.version()
+
+
+def save_config(payload: dict) -> dict:
+    return config_cache.save(payload)
@@ -0,0 +1,134 @@
+"""Tracking 300 ASINs: scraping every product page vs PA-API GetItems batches of 10.
+
+Both run against an httpx MockTransport. The PA-API stub re-signs each request and rejects
+bad SigV4 signatures. It also omits a few ASINs, as the real API does for items it cannot serve,
+and those go through the scraper fallback. The API is paced by the default amazon_paapi bucket
+(1 request/s). "scrape20" is the scraper with its default scrape_limit, the old links[:20] cap.
+"budget10" caps PA-API at 10 requests; the ASINs past the budget go to the scraper fallback.
+Run from the repository root: python -m backend.benchmarks.amazon_paapi
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from ..config import settings
+from ..db import close_pool, db_write, init_db
+from ..http_client import http_clients
+from ..sources.amazon import fetch_amazon_deals
+from ..sources.amazon_paapi import GET_ITEMS_PATH, GET_ITEMS_TARGET, sign_request
+
+ASINS = [f"B0BENCH{i:03d}" for i in range(300)]
+NOT_ACCESSIBLE = set(ASINS[::60])
+PAGE_LATENCY = 0.25
+API_LATENCY = 0.15
+ENDPOINT = "http://paapi.stub"
+CREDENTIALS = {"pa_api_access_key": "AKIDEXAMPLE", "pa_api_secret": "secret", "partner_tag": "smartdeals-20"}
+
+stats = {"page_requests": 0, "api_requests": 0, "bytes": 0, "bad_signatures": 0}
+
+
+def _page(asin: str) -> bytes:
+    filler = "<script>var a='" + "x" * 150_000 + "';</script>"
+    return (
+        f"<html><head><title>Amazon.com.br : {asin}</title>{filler}</head><body>"
+        f'<span id="productTitle">Produto {asin}</span>'
+        '<div id="corePrice_feature_div"><span class="a-price"><span class="a-offscreen">R$ 199,90</span></span>'
+        '<span class="a-price a-text-price"><span class="a-offscreen">R$ 299,90</span></span></div>'
+        '<div id="availability"><span>Em estoque</span></div></body></html>'
+    ).encode("utf-8")
+
+
+def _item(asin: str) -> dict:
+    return {
+        "ASIN": asin,
+        "DetailPageURL": f"https://www.amazon.com.br/dp/{asin}?tag=smartdeals-20",
+        "ItemInfo": {"Title": {"DisplayValue": f"Produto {asin}"}, "ByLineInfo": {"Brand": {"DisplayValue": "Marca"}}},
+        "Images": {"Primary": {"Medium": {"URL": f"https://m.media-amazon.com/images/I/{asin}.jpg"}}},
+        "Offers": {
+            "Listings": [
+                {
+                    "Price": {"Amount": 199.9, "Currency": "BRL"},
+                    "SavingBasis": {"Amount": 299.9, "Currency": "BRL"},
+                    "Availability": {"Type": "Now"},
+                    "Condition": {"Value": "New"},
+                    "MerchantInfo": {"Name": "Amazon.com.br"},
+                    "DeliveryInfo": {"IsFreeShippingEligible": True, "IsAmazonFulfilled": True},
+                }
+            ]
+        },
+    }
+
+
+async def _respond(request: httpx.Request) -> httpx.Response:
+    if request.url.host == "paapi.stub":
+        await asyncio.sleep(API_LATENCY)
+        stats["api_requests"] += 1
+        signed_at = datetime.strptime(request.headers["x-amz-date"], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+        expected = sign_request(
+            "AKIDEXAMPLE", "secret", "us-east-1", request.url.netloc.decode(), GET_ITEMS_PATH, GET_ITEMS_TARGET, request.content, signed_at
+        )
+        if request.headers.get("Authorization") != expected["Authorization"]:
+            stats["bad_signatures"] += 1
+            return httpx.Response(401, json={"Errors": [{"Code": "InvalidSignature", "Message": "bad signature"}]})
+        ids = json.loads(request.content)["ItemIds"]
+        items = [_item(asin) for asin in ids if asin not in NOT_ACCESSIBLE]
+        errors = [{"Code": "ItemNotAccessible", "Message": f"The ItemId {asin} is not accessible."} for asin in ids if asin in NOT_ACCESSIBLE]
+        body = json.dumps({"ItemsResult": {"Items": items}, "Errors": errors}).encode("utf-8")
+    else:
+        await asyncio.sleep(PAGE_LATENCY)
+        stats["page_requests"] += 1
+        body = _page(request.url.path.rsplit("/", 1)[-1])
+    stats["bytes"] += len(body)
+    return httpx.Response(200, content=body)
+
+
+def _clear_cache(conn) -> None:
+    conn.execute("DELETE FROM http_cache")
+
+
+async def _measure(label: str, amazon_cfg: dict) -> None:
+    for key in stats:
+        stats[key] = 0
+    await db_write(_clear_cache)
+    start = time.perf_counter()
+    deals = await fetch_amazon_deals({"amazon": amazon_cfg})
+    elapsed = time.perf_counter() - start
+    modes: dict[str, int] = {}
+    for deal in deals:
+        modes[deal.metadata["mode"]] = modes.get(deal.metadata["mode"], 0) + 1
+    print(
+        f"{label:<9} {elapsed:6.1f}s  deals {len(deals):3d} {modes}  api {stats['api_requests']:2d}  pages {stats['page_requests']:3d}  "
+        f"{stats['bytes'] / 1024 / 1024:6.1f} MiB  bad signatures {stats['bad_signatures']}"
+    )
+
+
+async def _run() -> None:
+    transport = httpx.MockTransport(_respond)
+    http_clients._clients["https://www.amazon.com.br"] = httpx.AsyncClient(transport=transport)
+    http_clients._clients[ENDPOINT] = httpx.AsyncClient(transport=transport)
+    await _measure("scrape20", {"manual_links": ASINS})
+    await _measure("scrape", {"manual_links": ASINS, "scrape_limit": len(ASINS)})
+    await _measure("paapi", {"manual_links": ASINS, "pa_api_endpoint": ENDPOINT, **CREDENTIALS})
+    await _measure("budget10", {"manual_links": ASINS, "pa_api_endpoint": ENDPOINT, "pa_api_max_requests": 10, **CREDENTIALS})
+    await http_clients.aclose()
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.db_path = str(Path(tmp) / "amazon_paapi.db")
+        init_db()
+        try:
+            await _run()
+        finally:
+            close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
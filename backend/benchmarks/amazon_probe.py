@@ -0,0 +1,115 @@
+"""Amazon product page probe: full download + <title> regex vs the streaming, byte-capped parser.
+
+The mock page is ~1.7 MB: a large inline <head>, the buy box ~320 KiB in, then carousels. Each
+connection streams at BANDWIDTH bytes/s; memory is measured in a second pass under tracemalloc.
+The HTTP cache is emptied before every pass so each probe really downloads the page.
+Run from the repository root: python -m backend.benchmarks.amazon_probe
+"""
+from __future__ import annotations
+
+import asyncio
+import re
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import httpx
+
+from ..concurrency import host_slot
+from ..config import settings
+from ..db import close_pool, db_write, init_db
+from ..http_client import http_clients
+from ..sources.amazon import _probe
+
+LINKS = 20
+CHUNK = 16_384
+BANDWIDTH = 4 * 1024 * 1024
+LINK = "https://www.amazon.com.br/dp/B0TESTASIN"
+
+
+def _page() -> bytes:
+    head = "<html><head><title>Amazon.com.br : Fone Bluetooth</title><script>" + "var a='" + "x" * 250_000 + "';</script>"
+    head += "<style>" + ".c{color:red}" * 6_000 + "</style></head><body>"
+    buy_box = (
+        '<div id="centerCol"><h1><span id="productTitle" class="a-size-large">  Fone de Ouvido Bluetooth Pro — Cancelamento de Ruído  </span></h1>'
+        '<div id="corePriceDisplay_desktop_feature_div"><span class="a-price aok-align-center priceToPay">'
+        '<span class="a-offscreen">R$&nbsp;1.299,90</span><span aria-hidden="true">1.299</span></span>'
+        '<span class="a-price a-text-price" data-a-strike="true"><span class="a-offscreen">R$ 1.799,00</span></span></div>'
+        '<div id="availability"><span class="a-size-medium a-color-success"> Em estoque </span></div></div>'
+    )
+    carousel = "".join(
+        f'<div class="carousel"><span class="a-price"><span class="a-offscreen">R$ {i},00</span></span><img src="/i/{i}.jpg"></div>'
+        for i in range(12_000)
+    )
+    return (head + buy_box + carousel + "</body></html>").encode("utf-8")
+
+
+PAGE = _page()
+served = 0
+
+
+class _Chunks(httpx.AsyncByteStream):
+    async def __aiter__(self):
+        global served
+        for start in range(0, len(PAGE), CHUNK):
+            served += CHUNK
+            yield PAGE[start:start + CHUNK]
+            await asyncio.sleep(CHUNK / BANDWIDTH)
+
+
+async def _respond(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, headers={"Content-Type": "text/html; charset=UTF-8"}, stream=_Chunks())
+
+
+async def _legacy(link: str) -> str:
+    async with host_slot(link):
+        resp = await http_clients.get(link).get(link, follow_redirects=True)
+    match = re.search(r"<title>(.*?)</title>", resp.text, re.I | re.S)
+    return match.group(1).strip() if match else "Amazon Item"
+
+
+def _clear_cache(conn) -> None:
+    conn.execute("DELETE FROM http_cache")
+
+
+async def _measure(label: str, probe) -> None:
+    global served
+    served = 0
+    await db_write(_clear_cache)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(probe(LINK) for _ in range(LINKS)))
+    elapsed = time.perf_counter() - start
+    await db_write(_clear_cache)
+    tracemalloc.start()
+    await asyncio.gather(*(probe(LINK) for _ in range(LINKS)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<8} {elapsed * 1000:7.1f}ms  {served / LINKS / 2 / 1024:7.1f} KiB/link  peak {peak / 1024 / 1024:6.1f} MiB  -> {results[0]}")
+
+
+async def _run() -> None:
+    print(f"page size {len(PAGE) / 1024:.0f} KiB, buy box at {PAGE.index(b'productTitle') / 1024:.0f} KiB, {LINKS} links")
+    http_clients._clients["https://www.amazon.com.br"] = httpx.AsyncClient(transport=httpx.MockTransport(_respond))
+    await _measure("legacy", _legacy)
+
+    async def streamed(link: str):
+        deal = await _probe(link, 600_000)
+        return deal.title, deal.current_price, deal.old_price, deal.metadata["available"], deal.metadata["complete"]
+
+    await _measure("stream", streamed)
+    await http_clients.aclose()
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.db_path = str(Path(tmp) / "amazon_probe.db")
+        init_db()
+        try:
+            await _run()
+        finally:
+            close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
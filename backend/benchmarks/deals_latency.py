@@ -0,0 +1,109 @@
+"""/deals query latency while a scan is writing: connection-per-call rollback journal vs the WAL pool.
+
+Run from the repository root: python -m backend.benchmarks.deals_latency
+"""
+from __future__ import annotations
+
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from ..config import settings
+from ..db import SCHEMA_SQL, close_pool, get_conn, get_write_conn, run_migrations
+from ..dedup import near_duplicates
+from ..ingest import ingest_deals
+from ..utils import json_load
+from .ingest import CONFIG, synthetic_deals
+
+SEED_ROWS = 20_000
+SCAN_ROWS = 40_000
+
+
+@contextmanager
+def _legacy_conn(path: str):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def _deals_page(conn) -> int:
+    rows = conn.execute("SELECT * FROM deals ORDER BY created_at DESC LIMIT 300").fetchall()
+    return len([{**dict(r), "reasons": json_load(r["reasons"], []), "metadata": json_load(r["metadata"], {})} for r in rows])
+
+
+def _prepare(path: str, wal: bool) -> None:
+    conn = sqlite3.connect(path)
+    if wal:
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA_SQL)
+    run_migrations(conn)
+    near_duplicates.reset()
+    conn.row_factory = sqlite3.Row
+    ingest_deals(conn, synthetic_deals(SEED_ROWS, seed=1), CONFIG)
+    conn.commit()
+    conn.close()
+
+
+def _measure(label: str, reader, writer) -> None:
+    scan = synthetic_deals(SCAN_ROWS, seed=2)
+    for d in scan:
+        d.product_id = f"SCAN{d.product_id}"
+        d.title = f"scan {d.title}"
+    samples: list[float] = []
+    errors = 0
+    writing = threading.Event()
+    done = threading.Event()
+
+    def write() -> None:
+        with writer() as conn:
+            writing.set()
+            ingest_deals(conn, scan, CONFIG)
+            conn.commit()
+        done.set()
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    writing.wait()
+    while not done.is_set():
+        start = time.perf_counter()
+        try:
+            with reader() as conn:
+                _deals_page(conn)
+            samples.append(time.perf_counter() - start)
+        except sqlite3.OperationalError:
+            errors += 1
+    thread.join()
+
+    if not samples:
+        print(f"{label:<8} no successful reads, errors={errors}")
+        return
+    ordered = sorted(samples)
+    p99 = ordered[max(0, int(len(ordered) * 0.99) - 1)]
+    print(
+        f"{label:<8} reads={len(samples):5d} errors={errors} "
+        f"p50={statistics.median(samples) * 1000:8.2f}ms p99={p99 * 1000:8.2f}ms max={ordered[-1] * 1000:8.2f}ms"
+    )
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = str(Path(tmp) / "legacy.db")
+        _prepare(legacy_path, wal=False)
+        _measure("legacy", lambda: _legacy_conn(legacy_path), lambda: _legacy_conn(legacy_path))
+
+        pooled_path = str(Path(tmp) / "pooled.db")
+        _prepare(pooled_path, wal=True)
+        settings.db_path = pooled_path
+        _measure("pooled", get_conn, get_write_conn)
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
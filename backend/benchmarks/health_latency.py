@@ -0,0 +1,84 @@
+"""/health latency while a large scan is ingesting, with ingestion inline on the event loop vs on the DB thread.
+
+Run from the repository root: python -m backend.benchmarks.health_latency
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from .. import collector, main
+from ..config import settings
+from ..db import close_pool, get_write_conn, init_db
+from ..dedup import near_duplicates
+from ..ingest import ingest_deals
+from .ingest import synthetic_deals
+
+SCAN_ROWS = 30_000
+
+
+async def _probe_health(client: httpx.AsyncClient, stop: asyncio.Event) -> list[float]:
+    samples = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        (await client.get("/health")).raise_for_status()
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.005)
+    return samples
+
+
+async def _inline_scan() -> None:
+    # What collect_and_process used to do: sqlite3 calls straight on the event loop.
+    cfg = main.get_config()
+    incoming, _ = await collector.collect_deals(cfg)
+    with get_write_conn() as conn:
+        ingest_deals(conn, incoming, cfg)
+        conn.commit()
+
+
+async def _measure(label: str, scan) -> None:
+    stop = asyncio.Event()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        probe = asyncio.create_task(_probe_health(client, stop))
+        await asyncio.sleep(0.2)
+        start = time.perf_counter()
+        await scan()
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0.2)
+        stop.set()
+        samples = await probe
+    ordered = sorted(samples)
+    print(
+        f"{label:<8} scan={elapsed:6.2f}s probes={len(samples):5d} "
+        f"p50={statistics.median(samples) * 1000:8.2f}ms p99={ordered[int(len(ordered) * 0.99) - 1] * 1000:8.2f}ms "
+        f"max={ordered[-1] * 1000:8.2f}ms"
+    )
+
+
+async def _run() -> None:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    for label, scan in (("inline", _inline_scan), ("db-thread", main.collect_and_process)):
+        with tempfile.TemporaryDirectory() as tmp:
+            settings.db_path = str(Path(tmp) / f"{label}.db")
+            init_db()
+            near_duplicates.reset()
+            batch = synthetic_deals(SCAN_ROWS, seed=len(label))
+
+            async def source(config, sink, persist=True):
+                sink.extend(batch)
+                return sink
+
+            collector.SOURCES = {"synthetic": source}
+            await _measure(label, scan)
+            close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(_run())
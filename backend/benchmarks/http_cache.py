@@ -0,0 +1,120 @@
+"""Source HTTP cache: requests and bytes per scan, cold vs fresh vs revalidated vs offline.
+
+Five Mercado Livre searches and ten Amazon links (two of them dead) are answered by an httpx
+MockTransport after LATENCY seconds. Both mocks send an ETag and honour If-None-Match with a 304.
+"Revalidated" expires every entry first, as happens once the per-source TTL has passed.
+Run from the repository root: python -m backend.benchmarks.http_cache
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from ..collector import collect_deals
+from ..config import settings
+from ..db import close_pool, db_read, db_write, init_db
+from ..http_cache import cache_summary, offline_mode
+from ..http_client import http_clients
+
+LATENCY = 0.05
+KEYWORDS = ["rtx 5060", "tenis new balance", "air fryer", "monitor 144hz", "ssd nvme"]
+LINKS = [f"https://www.amazon.com.br/dp/B0TEST{i:04d}" for i in range(10)]
+DEAD = set(LINKS[-2:])
+CFG = {"seed_keywords": KEYWORDS, "amazon": {"manual_links": LINKS}}
+
+stats = {"requests": 0, "not_modified": 0, "bytes": 0}
+
+
+def _search_body(q: str) -> bytes:
+    results = [
+        {
+            "id": f"MLB{abs(hash((q, i))) % 10**9}",
+            "title": f"{q} oferta {i} " + "descricao " * 40,
+            "price": 100 + i,
+            "original_price": 150 + i,
+            "permalink": f"https://produto.mercadolivre.com.br/{q}-{i}",
+            "thumbnail": f"https://http2.mlstatic.com/{i}.jpg",
+            "attributes": [{"id": f"A{j}", "value_name": "x" * 30} for j in range(20)],
+        }
+        for i in range(10)
+    ]
+    return json.dumps({"results": results, "paging": {"total": 10}}).encode("utf-8")
+
+
+def _page(link: str) -> bytes:
+    filler = "<script>var a='" + "x" * 40_000 + "';</script>"
+    return (
+        f"<html><head><title>Amazon.com.br : {link[-10:]}</title>{filler}</head><body>"
+        f'<span id="productTitle">Produto {link[-10:]}</span>'
+        '<div id="corePrice_feature_div"><span class="a-price"><span class="a-offscreen">R$ 199,90</span></span></div>'
+        '<div id="availability"><span>Em estoque</span></div></body></html>'
+    ).encode("utf-8")
+
+
+async def _respond(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(LATENCY)
+    stats["requests"] += 1
+    url = str(request.url)
+    if request.url.host == "www.amazon.com.br":
+        if url in DEAD:
+            return httpx.Response(404, content=b"not found")
+        body, content_type = _page(url), "text/html; charset=UTF-8"
+    else:
+        body, content_type = _search_body(request.url.params["q"]), "application/json"
+    etag = '"' + hashlib.md5(body).hexdigest() + '"'
+    if request.headers.get("If-None-Match") == etag:
+        stats["not_modified"] += 1
+        return httpx.Response(304, headers={"ETag": etag})
+    stats["bytes"] += len(body)
+    return httpx.Response(200, headers={"ETag": etag, "Content-Type": content_type}, content=body)
+
+
+def _expire_all(conn) -> None:
+    conn.execute("UPDATE http_cache SET expires_at=0")
+
+
+async def _scan(label: str) -> None:
+    for key in stats:
+        stats[key] = 0
+    start = time.perf_counter()
+    deals, _ = await collect_deals(CFG)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<12} {elapsed * 1000:7.1f}ms  requests {stats['requests']:3d}  304s {stats['not_modified']:3d}  "
+        f"body {stats['bytes'] / 1024:7.1f} KiB  deals {len(deals)}"
+    )
+
+
+async def _run() -> None:
+    transport = httpx.MockTransport(_respond)
+    http_clients._clients["https://api.mercadolibre.com"] = httpx.AsyncClient(transport=transport)
+    http_clients._clients["https://www.amazon.com.br"] = httpx.AsyncClient(transport=transport)
+    await _scan("cold")
+    await _scan("fresh")
+    await db_write(_expire_all)
+    await _scan("revalidated")
+    with offline_mode():
+        await _scan("offline")
+    summary = await db_read(cache_summary)
+    print(f"cache: {summary['entries']} entries, {summary['bytes'] / 1024:.1f} KiB stored, {summary['negative']} negative")
+    await http_clients.aclose()
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.db_path = str(Path(tmp) / "http_cache.db")
+        init_db()
+        try:
+            await _run()
+        finally:
+            close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
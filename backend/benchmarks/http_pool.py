@@ -0,0 +1,76 @@
+"""Per-request latency of a fresh AsyncClient per call vs the pooled registry.
+
+Run from the repository root: python -m backend.benchmarks.http_pool
+"""
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from ..http_client import HttpClients
+
+REQUESTS = 300
+BODY = b'{"results": []}'
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            if not head:
+                break
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(BODY)}\r\n\r\n".encode()
+                + BODY
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _fresh(url: str) -> list[float]:
+    samples = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        async with httpx.AsyncClient(timeout=15) as client:
+            (await client.get(url)).raise_for_status()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def _pooled(url: str) -> list[float]:
+    clients = HttpClients()
+    samples = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        (await clients.get(url).get(url)).raise_for_status()
+        samples.append(time.perf_counter() - start)
+    await clients.aclose()
+    return samples
+
+
+def _report(label: str, samples: list[float]) -> float:
+    mean = statistics.mean(samples) * 1000
+    p99 = sorted(samples)[int(len(samples) * 0.99) - 1] * 1000
+    print(f"{label:<8} mean={mean:.3f}ms p50={statistics.median(samples) * 1000:.3f}ms p99={p99:.3f}ms")
+    return mean
+
+
+async def main() -> None:
+    server = await asyncio.start_server(_handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/sites/MLB/search"
+    async with server:
+        fresh = _report("fresh", await _fresh(url))
+        pooled = _report("pooled", await _pooled(url))
+    print(f"saved per request: {fresh - pooled:.3f}ms ({fresh / pooled:.1f}x), excluding TLS handshakes")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
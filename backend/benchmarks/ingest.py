@@ -0,0 +1,120 @@
+"""Row-by-row ingestion loop vs the batched ingest_deals path.
+
+Run from the repository root: python -m backend.benchmarks.ingest [count]
+"""
+from __future__ import annotations
+
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from ..db import SCHEMA_SQL, run_migrations
+from ..dedup import near_duplicates
+from ..ingest import ingest_deals, rescore_deals
+from ..models import DealInput
+from ..utils import json_dump, now_utc, similarity_key
+
+CONFIG = {"mode": "MANUAL", "price_min": 10, "price_max": 15000, "blocked_words": ["réplica", "usado"], "min_discount_percent": 20}
+
+
+def synthetic_deals(count: int, seed: int = 7) -> list[DealInput]:
+    rng = random.Random(seed)
+    vocabulary = [f"termo{i}" for i in range(3000)]
+    titles: list[str] = []
+    deals = []
+    for i in range(count):
+        roll = rng.random()
+        if titles and roll < 0.05:
+            # Exact repeat of an earlier title: caught by the similarity key.
+            title = rng.choice(titles)
+        elif titles and roll < 0.10:
+            # Same product from another seller with a slightly different title.
+            words = rng.choice(titles).split()
+            words.append(rng.choice(["original", "lacrado", "envio imediato", "promoção"]))
+            title = " ".join(words)
+        else:
+            title = " ".join(rng.sample(vocabulary, 7)) + f" modelo X{i}"
+        titles.append(title)
+        price = round(rng.uniform(20, 3000), 2)
+        deals.append(
+            DealInput(
+                source="mercadolivre",
+                product_id=f"MLB{i}",
+                title=title,
+                url=f"https://produto.mercadolivre.com.br/MLB{i}",
+                current_price=price,
+                old_price=round(price * rng.uniform(1.0, 1.6), 2),
+                seller_reputation=rng.choice(["5_green", "4_light_green", "2_orange", "1_red"]),
+                is_official_store=rng.random() < 0.2,
+                shipping_free=rng.random() < 0.5,
+                sold_quantity=rng.randrange(500),
+                metadata={"raw": {"id": f"MLB{i}"}},
+            )
+        )
+    return deals
+
+
+def legacy_ingest(conn, incoming: list[DealInput], cfg: dict) -> int:
+    new_count = 0
+    for d in incoming:
+        if d.current_price and (d.current_price < cfg.get("price_min", 0) or d.current_price > cfg.get("price_max", 1e9)):
+            continue
+        created = now_utc().isoformat()
+        sim_key = similarity_key(d.title, d.brand, d.model)
+        if conn.execute("SELECT id FROM deals WHERE source=? AND product_id=?", (d.source, d.product_id)).fetchone():
+            continue
+        if conn.execute("SELECT id FROM deals WHERE similarity_key=?", (sim_key,)).fetchone():
+            continue
+        cur = conn.execute(
+            """
+            INSERT INTO deals(source,product_id,similarity_key,title,url,current_price,old_price,currency,seller_name,seller_reputation,
+            is_official_store,shipping_free,sold_quantity,condition,category,image_url,brand,model,coupon,metadata,status,created_at,updated_at)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+            """,
+            (
+                d.source, d.product_id, sim_key, d.title, d.url, d.current_price, d.old_price, d.currency, d.seller_name,
+                d.seller_reputation, int(d.is_official_store), int(d.shipping_free), d.sold_quantity, d.condition,
+                d.category, d.image_url, d.brand, d.model, d.coupon, json_dump(d.metadata or {}), "new", created, created,
+            ),
+        )
+        conn.execute(
+            "INSERT INTO deal_price_history(deal_source,product_id,price,captured_at) VALUES (?,?,?,?)",
+            (d.source, d.product_id, d.current_price, created),
+        )
+        # One-row batches through the production scorer, as the old per-deal scoring call did.
+        rescore_deals(conn, {cur.lastrowid}, cfg)
+        new_count += 1
+    return new_count
+
+
+def _run(label: str, ingest, deals: list[DealInput], workdir: Path, cfg: dict = CONFIG) -> None:
+    conn = sqlite3.connect(workdir / f"{label}.db")
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA_SQL)
+    run_migrations(conn)
+    near_duplicates.reset()
+    start = time.perf_counter()
+    ingest(conn, deals, cfg)
+    conn.commit()
+    elapsed = time.perf_counter() - start
+    inserted = conn.execute("SELECT COUNT(*) FROM deals").fetchone()[0]
+    conn.close()
+    print(f"{label:<8} {elapsed:8.3f}s  {len(deals) / elapsed:10.0f} deals/s  inserted={inserted}")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    deals = synthetic_deals(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        _run("legacy", legacy_ingest, deals, Path(tmp))
+        # Like-for-like with the legacy loop, which never had a near-duplicate check; the last
+        # row adds the MinHash/LSH check on top so its cost shows up as its own line.
+        _run("batched", ingest_deals, deals, Path(tmp), {**CONFIG, "dedup": {"near_duplicates": False}})
+        _run("+minhash", ingest_deals, deals, Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
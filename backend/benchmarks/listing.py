@@ -0,0 +1,102 @@
+"""/deals response size and latency: the old SELECT * page vs projected keyset pages.
+
+Run from the repository root: python -m backend.benchmarks.listing
+"""
+from __future__ import annotations
+
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from ..config import settings
+from ..db import close_pool, get_write_conn, init_db
+from ..dedup import near_duplicates
+from ..ingest import ingest_deals
+from ..main import app
+from ..security import get_current_user
+from ..utils import json_dump, json_load
+from .ingest import CONFIG, synthetic_deals
+
+ROWS = 20_000
+# A Mercado Livre item as stored in metadata["raw"] is a few kilobytes of JSON.
+RAW_ITEM = {
+    "attributes": [{"id": f"ATTR{i}", "name": f"Atributo {i}", "value_name": "valor " * 4} for i in range(30)],
+    "pictures": [{"id": f"PIC{i}", "url": f"https://http2.mlstatic.com/D_{i}-O.jpg"} for i in range(8)],
+    "shipping": {"free_shipping": True, "mode": "me2", "tags": ["fulfillment", "mandatory_free_shipping"]},
+}
+
+
+def _seed() -> None:
+    init_db()
+    near_duplicates.reset()
+    with get_write_conn() as conn:
+        ingest_deals(conn, synthetic_deals(ROWS, seed=3), CONFIG)
+        conn.execute("UPDATE deals SET metadata=?", (json_dump({"raw": RAW_ITEM}),))
+        conn.commit()
+
+
+def _legacy_page(client: TestClient) -> tuple[int, float]:
+    from ..db import get_conn
+
+    start = time.perf_counter()
+    with get_conn() as conn:
+        rows = conn.execute("SELECT * FROM deals WHERE 1=1 ORDER BY created_at DESC LIMIT 300").fetchall()
+        body = json_dump(
+            [{**dict(r), "reasons": json_load(r["reasons"], []), "metadata": json_load(r["metadata"], {})} for r in rows]
+        )
+    return len(body.encode("utf-8")), time.perf_counter() - start
+
+
+def _timed(client: TestClient, url: str) -> tuple[int, float, str | None]:
+    start = time.perf_counter()
+    response = client.get(url)
+    response.raise_for_status()
+    return len(response.content), time.perf_counter() - start, response.headers.get("X-Next-Cursor")
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+        settings.db_path = str(Path(tmp) / "listing.db")
+        _seed()
+        app.dependency_overrides[get_current_user] = lambda: "bench"
+        client = TestClient(app)
+
+        size, seconds = _legacy_page(client)
+        print(f"{'legacy SELECT * x300':<34} {size / 1024:9.1f} KiB {seconds * 1000:8.1f}ms")
+        for label, url in (
+            ("default page (no metadata) x100", "/deals"),
+            ("dashboard fields x100", "/deals?fields=source,title,current_price,score,status"),
+            ("with metadata x100", "/deals?fields=title,metadata"),
+        ):
+            size, seconds, _ = _timed(client, url)
+            print(f"{label:<34} {size / 1024:9.1f} KiB {seconds * 1000:8.1f}ms")
+
+        # Walk every page to check keyset pages never overlap or skip rows.
+        with get_write_conn() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM deals").fetchone()[0]
+        seen: set[int] = set()
+        cursor = None
+        pages = 0
+        start = time.perf_counter()
+        while True:
+            response = client.get("/deals", params={"fields": "title", "limit": 300, "cursor": cursor})
+            ids = [d["id"] for d in response.json()]
+            assert not seen.intersection(ids)
+            seen.update(ids)
+            pages += 1
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        elapsed = time.perf_counter() - start
+        assert len(seen) == total
+        print(f"walked {pages} pages / {len(seen)} deals in {elapsed:.2f}s ({elapsed / pages * 1000:.1f}ms per page)")
+        app.dependency_overrides.clear()
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""30-day price statistics: AVG() over raw deal_price_history vs the price_daily rollup.
+
+Seeds PRODUCTS products with POINTS_PER_DAY points a day over DAYS days. It times the stats
+lookup for a rescore batch of BATCH products both ways, then prunes the raw points past
+retention.
+Run from the repository root: python -m backend.benchmarks.price_stats
+"""
+from __future__ import annotations
+
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from ..db import SCHEMA_SQL, run_migrations
+from ..price_stats import price_stats_30d, prune_price_history
+from ..utils import json_dump, now_utc
+
+PRODUCTS = 1000
+DAYS = 100
+POINTS_PER_DAY = 12
+BATCH = 500
+RETENTION_DAYS = 90
+
+
+def _raw_avgs(conn, keys: set[tuple[str, str]]) -> dict:
+    since = (now_utc() - timedelta(days=30)).isoformat()
+    rows = conn.execute(
+        """
+        SELECT h.deal_source, h.product_id, AVG(h.price) AS avg_price, MIN(h.price) AS min_price
+        FROM json_each(?) AS k
+        JOIN deal_price_history h
+          ON h.deal_source=json_extract(k.value, '$[0]') AND h.product_id=json_extract(k.value, '$[1]') AND h.captured_at>=?
+        GROUP BY h.deal_source, h.product_id
+        """,
+        (json_dump(sorted(keys)), since),
+    ).fetchall()
+    return {(r[0], r[1]): r[2] for r in rows}
+
+
+def main() -> None:
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp) / "price_stats.db")
+        conn.row_factory = sqlite3.Row
+        conn.executescript(SCHEMA_SQL)
+        run_migrations(conn)
+        now = now_utc()
+        start = time.perf_counter()
+        for day in range(DAYS):
+            rows = [
+                ("mercadolivre", f"MLB{p}", round(100 + rng.uniform(-20, 20), 2), (now - timedelta(days=day, hours=h * 2)).isoformat())
+                for p in range(PRODUCTS)
+                for h in range(POINTS_PER_DAY)
+            ]
+            conn.executemany("INSERT INTO deal_price_history(deal_source,product_id,price,captured_at) VALUES (?,?,?,?)", rows)
+        conn.commit()
+        seeded = time.perf_counter() - start
+        raw_rows = conn.execute("SELECT COUNT(*) FROM deal_price_history").fetchone()[0]
+        rollup_rows = conn.execute("SELECT COUNT(*) FROM price_daily").fetchone()[0]
+        print(f"seeded {raw_rows} raw points ({rollup_rows} rollup rows) in {seeded:.1f}s")
+
+        keys = {("mercadolivre", f"MLB{p}") for p in rng.sample(range(PRODUCTS), BATCH)}
+        for label, fn in (("raw", _raw_avgs), ("rollup", price_stats_30d)):
+            fn(conn, keys)
+            start = time.perf_counter()
+            for _ in range(5):
+                result = fn(conn, keys)
+            print(f"{label:<7} {(time.perf_counter() - start) / 5 * 1000:8.1f}ms per {BATCH}-deal batch  ({len(result)} products)")
+
+        start = time.perf_counter()
+        pruned = 0
+        while True:
+            deleted = prune_price_history(conn, RETENTION_DAYS)
+            pruned += deleted
+            if deleted < 5000:
+                break
+        conn.commit()
+        print(f"pruned {pruned} points older than {RETENTION_DAYS} days in {time.perf_counter() - start:.1f}s")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
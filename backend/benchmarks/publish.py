@@ -0,0 +1,123 @@
+"""Publishing 15 deals to Telegram + 50 WhatsApp recipients: the old serial loop vs the outbox.
+
+Providers are simulated with an httpx MockTransport that answers after LATENCY seconds; every
+tenth WhatsApp call is throttled once so the retry path is exercised too.
+Run from the repository root: python -m backend.benchmarks.publish
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from ..app_config import default_config, save_config
+from ..config import settings
+from ..db import close_pool, db_write, get_conn, init_db
+from ..formatter import format_post_message
+from ..http_client import http_clients
+from ..outbox import outbox_summary, outbox_worker
+from ..publisher import publish_deals, send_job
+from ..utils import json_dump, now_utc
+
+LATENCY = 0.02
+THROTTLE = False
+DEALS = 15
+RECIPIENTS = 50
+CFG = {
+    "telegram": {"bot_token": "t", "chat_id": "1"},
+    "whatsapp": {"provider": "cloud", "token": "t", "phone_number_id": "1", "to_numbers": [f"55119{i:08d}" for i in range(RECIPIENTS)]},
+}
+
+
+_throttled: set[str] = set()
+
+
+async def _respond(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(LATENCY)
+    if request.url.host == "api.telegram.org":
+        return httpx.Response(200, json={"result": {"message_id": 1}})
+    to = json.loads(request.content).get("to", "")
+    if THROTTLE and to.endswith("0") and to not in _throttled:
+        _throttled.add(to)
+        return httpx.Response(400, json={"error": {"code": 130429, "message": "Rate limit hit"}}, headers={"Retry-After": "0"})
+    return httpx.Response(200, json={"messages": [{"id": "wamid"}]})
+
+
+def _install_mock_clients() -> None:
+    for base in ("https://api.telegram.org", "https://graph.facebook.com"):
+        http_clients._clients[base] = httpx.AsyncClient(transport=httpx.MockTransport(_respond))
+
+
+def _seed(conn) -> list[dict]:
+    created = now_utc().isoformat()
+    conn.executemany(
+        "INSERT INTO deals(source,product_id,title,url,current_price,status,created_at,updated_at) VALUES (?,?,?,?,?,?,?,?)",
+        [("mercadolivre", f"MLB{i}", f"Oferta {i}", f"https://x/{i}", 99.9, "approved", created, created) for i in range(DEALS)],
+    )
+    return [dict(r) for r in conn.execute("SELECT * FROM deals ORDER BY id").fetchall()]
+
+
+def _insert_posts(conn, rows: list[tuple]) -> None:
+    conn.executemany("INSERT INTO posts(deal_id,channel,status,external_id,payload,created_at) VALUES (?,?,?,?,?,?)", rows)
+
+
+async def _legacy(deals: list[dict]) -> None:
+    # What publish_deal did before: Telegram, then each WhatsApp number in turn, one deal after another.
+    for deal in deals:
+        message = format_post_message({**deal, "reasons": []})
+        tg = http_clients.get("https://api.telegram.org")
+        await tg.post("https://api.telegram.org/bott/sendMessage", json={"text": message})
+        wa = http_clients.get("https://graph.facebook.com")
+        for number in CFG["whatsapp"]["to_numbers"]:
+            await wa.post("https://graph.facebook.com/v20.0/1/messages", json={"to": number, "text": message})
+        payload = json_dump({"message": message})
+        await db_write(_insert_posts, [(deal["id"], "telegram", "posted", "1", payload, now_utc().isoformat())])
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.db_path = str(Path(tmp) / "publish.db")
+        init_db()
+        deals = await db_write(_seed)
+        _install_mock_clients()
+
+        start = time.perf_counter()
+        await _legacy(deals)
+        print(f"serial       {time.perf_counter() - start:7.2f}s  ({DEALS * (RECIPIENTS + 1)} calls)")
+
+        global THROTTLE
+        THROTTLE = True
+        # Every recipient gets 15 messages here; lift the per-number pacing so this measures fan-out only.
+        limits = {name: {"rate": 1000, "burst": 1000} for name in default_config()["rate_limits"]}
+        save_config({**default_config(), **CFG, "rate_limits": limits})
+        settings.outbox_poll_seconds = 0.05
+        outbox_worker.start(send_job)
+        start = time.perf_counter()
+        await publish_deals(deals, CFG)
+        approve_latency = time.perf_counter() - start
+        while True:
+            with get_conn() as conn:
+                summary = outbox_summary(conn)
+            if set(summary) <= {"done", "failed"}:
+                break
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        # Publishing the same deals again must not queue anything: the idempotency keys already exist.
+        await publish_deals(deals, CFG)
+        await outbox_worker.stop()
+        with get_conn() as conn:
+            posts = conn.execute("SELECT COUNT(*) FROM posts WHERE status='posted' AND channel='whatsapp'").fetchone()[0]
+            retried = conn.execute("SELECT COUNT(*) FROM outbox WHERE attempts > 1").fetchone()[0]
+            total = conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+        assert posts == DEALS * RECIPIENTS and total == DEALS * (RECIPIENTS + 1) and summary == {"done": total}
+        print(f"outbox       {elapsed:7.2f}s  (enqueue {approve_latency * 1000:.1f}ms, {posts} whatsapp posts, {retried} retried after throttling)")
+        await http_clients.aclose()
+        close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
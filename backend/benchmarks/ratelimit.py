@@ -0,0 +1,95 @@
+"""Telegram burst against a provider that enforces its documented limits, with and without pacing.
+
+The mock answers 429 with retry_after when a chat exceeds CHAT_RATE/s or the bot exceeds GLOBAL_RATE/s.
+Run from the repository root: python -m backend.benchmarks.ratelimit
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from ..app_config import default_config, save_config
+from ..config import settings
+from ..db import close_pool, init_db
+from ..http_client import http_clients
+from ..poster.errors import RetryLater
+from ..poster.telegram import post_to_telegram
+from ..ratelimit import TokenBucket, rate_limiter
+
+CHATS = 3
+MESSAGES_PER_CHAT = 40
+CHAT_RATE = 10
+GLOBAL_RATE = 20
+
+
+class _Provider:
+    def __init__(self) -> None:
+        self.global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+        self.chat_buckets: dict[str, TokenBucket] = {}
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        chat = json.loads(request.content)["chat_id"]
+        bucket = self.chat_buckets.setdefault(chat, TokenBucket(CHAT_RATE, CHAT_RATE))
+        now = time.monotonic()
+        for b in (bucket, self.global_bucket):
+            b._refill(now)
+        # Small tolerance for timer jitter; a client pacing at exactly the documented rate must pass.
+        if bucket.tokens < 0.99 or self.global_bucket.tokens < 0.99:
+            return httpx.Response(429, json={"ok": False, "error_code": 429, "parameters": {"retry_after": 1}})
+        bucket.tokens -= 1
+        self.global_bucket.tokens -= 1
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": 1}})
+
+
+async def _no_wait(*args) -> float:
+    return 0.0
+
+
+async def _burst(label: str) -> None:
+    http_clients._clients["https://api.telegram.org"] = httpx.AsyncClient(transport=httpx.MockTransport(_Provider()))
+    rejected = 0
+    start = time.perf_counter()
+
+    async def send(chat: int) -> None:
+        nonlocal rejected
+        while True:
+            try:
+                await post_to_telegram("oferta", {"bot_token": "t", "chat_id": f"chat{chat}"})
+                return
+            except RetryLater as exc:
+                rejected += 1
+                await asyncio.sleep(exc.retry_after or 1)
+
+    await asyncio.gather(*(send(chat) for chat in range(CHATS) for _ in range(MESSAGES_PER_CHAT)))
+    print(f"{label:<10} {time.perf_counter() - start:6.2f}s  429s={rejected:4d}  limiter={rate_limiter.stats().get('telegram', {})}")
+    await http_clients.aclose()
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.db_path = str(Path(tmp) / "ratelimit.db")
+        settings.host_concurrency["api.telegram.org"] = 64
+        init_db()
+        limits = default_config()["rate_limits"]
+
+        # Baseline: no pacing at all, only sleeping out retry_after after each 429 (the old behaviour).
+        acquire, penalize = rate_limiter.acquire, rate_limiter.penalize
+        rate_limiter.acquire = _no_wait
+        rate_limiter.penalize = lambda *args: None
+        await _burst("unpaced")
+        rate_limiter.acquire, rate_limiter.penalize = acquire, penalize
+
+        limits["telegram"] = {"rate": GLOBAL_RATE, "burst": GLOBAL_RATE}
+        limits["telegram_destination"] = {"rate": CHAT_RATE, "burst": CHAT_RATE}
+        save_config({"rate_limits": limits})
+        await _burst("paced")
+        close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+"""Refreshing tracked Mercado Livre items: one GET /items/{id} each vs /items?ids= multi-get.
+
+Part 1 seeds ITEMS pending deals and refreshes them all through an httpx MockTransport that
+answers after LATENCY seconds, changing ~10% of prices.
+Part 2 replays a simulated day for the same items: VOLATILE_SHARE of them change price every
+30 minutes and the rest every 3 days. It compares polling every refresh_min_minutes with the
+adaptive per-item interval, counting requests (checks / 20, since each tick batches every due
+item) and how long a price change goes unnoticed.
+Run from the repository root: python -m backend.benchmarks.refresh
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from ..app_config import get_config
+from ..concurrency import host_slot
+from ..config import settings
+from ..db import close_pool, db_write, init_db
+from ..http_client import http_clients
+from ..ingest import ingest_deals
+from ..models import DealInput
+from ..refresh import next_interval, refresh_tracked
+from ..sources.mercadolivre import ML_API_BASE, ML_MULTIGET_SIZE
+
+ITEMS = 2000
+LATENCY = 0.05
+VOLATILE_SHARE = 0.1
+WORDS = [f"{a}{b}" for a in ("ka", "lo", "mi", "ne", "pu", "ra", "si", "tu", "ve", "zo") for b in ("bar", "cen", "dor", "fil", "gon", "lux", "mar", "nix", "pol", "tek")]
+
+requests = 0
+
+
+def _item(item_id: str) -> dict:
+    rng = random.Random(item_id)
+    price = 100.0 + rng.randint(0, 500)
+    if random.random() < 0.1:
+        price -= 5
+    return {"id": item_id, "price": price, "original_price": price * 1.3, "status": "active", "available_quantity": 3}
+
+
+async def _respond(request: httpx.Request) -> httpx.Response:
+    global requests
+    await asyncio.sleep(LATENCY)
+    requests += 1
+    if request.url.path == "/items":
+        ids = request.url.params["ids"].split(",")
+        return httpx.Response(200, json=[{"code": 200, "body": _item(item_id)} for item_id in ids])
+    return httpx.Response(200, json=_item(request.url.path.rsplit("/", 1)[-1]))
+
+
+def _seed_deals() -> list[DealInput]:
+    deals = []
+    for i in range(ITEMS):
+        rng = random.Random(i)
+        item_id = f"MLB{i:09d}"
+        deals.append(
+            DealInput(
+                source="mercadolivre",
+                product_id=item_id,
+                title=" ".join(rng.sample(WORDS, 6)) + f" {i}",
+                url=f"https://produto.mercadolivre.com.br/{item_id}",
+                current_price=100.0 + random.Random(item_id).randint(0, 500),
+                old_price=None,
+            )
+        )
+    return deals
+
+
+async def _single_gets(ids: list[str]) -> None:
+    async def run(item_id: str) -> None:
+        url = f"{ML_API_BASE}/items/{item_id}"
+        async with host_slot(url):
+            resp = await http_clients.get(url).get(url)
+            resp.json()
+
+    await asyncio.gather(*(run(item_id) for item_id in ids))
+
+
+async def _part_one() -> None:
+    global requests
+    http_clients._clients[ML_API_BASE] = httpx.AsyncClient(transport=httpx.MockTransport(_respond))
+    stats = await db_write(ingest_deals, _seed_deals(), get_config())
+    print(f"seeded {stats['new']} pending deals")
+
+    requests = 0
+    start = time.perf_counter()
+    await _single_gets([f"MLB{i:09d}" for i in range(ITEMS)])
+    print(f"single    {time.perf_counter() - start:6.2f}s  requests {requests:5d}")
+
+    requests = 0
+    start = time.perf_counter()
+    stats = await refresh_tracked()
+    print(f"multiget  {time.perf_counter() - start:6.2f}s  requests {requests:5d}  {stats}")
+    await http_clients.aclose()
+
+
+def _part_two() -> None:
+    tracking = get_config()["price_tracking"]
+    low = float(tracking["refresh_min_minutes"])
+    day = 24 * 60
+    rng = random.Random(7)
+    periods = [30.0 if rng.random() < VOLATILE_SHARE else 3 * day for _ in range(ITEMS)]
+
+    def simulate(adaptive: bool) -> tuple[int, float]:
+        checks = 0
+        unnoticed = 0.0
+        changes = 0
+        for period in periods:
+            offset = rng.uniform(0, period)
+            change_times = [offset + k * period for k in range(int(day // period) + 1) if offset + k * period < day]
+            t, interval, seen, changed = 0.0, None, 0, False
+            while True:
+                interval = next_interval(interval, changed, tracking) if adaptive else low
+                t += interval
+                if t > day:
+                    break
+                checks += 1
+                changed = False
+                while seen < len(change_times) and change_times[seen] <= t:
+                    unnoticed += t - change_times[seen]
+                    changes += 1
+                    seen += 1
+                    changed = True
+        return -(-checks // ML_MULTIGET_SIZE), unnoticed / max(changes, 1)
+
+    for label, adaptive in (("fixed", False), ("adaptive", True)):
+        calls, lag = simulate(adaptive)
+        print(f"{label:<9} {calls:6d} multi-get requests/day  mean time to notice a change {lag:6.1f} min")
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.db_path = str(Path(tmp) / "refresh.db")
+        init_db()
+        try:
+            await _part_one()
+            _part_two()
+        finally:
+            close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+"""score_deal with compiled rules vs rebuilding the blocked-word list per call.
+
+Run from the repository root: python -m backend.benchmarks.scoring
+"""
+from __future__ import annotations
+
+import random
+import string
+import time
+
+from ..scoring import compile_rules, score_deal
+from .ingest import synthetic_deals
+
+DEALS = 5_000
+
+
+def legacy_blocked(deal: dict, config: dict) -> bool:
+    blocked_words = [w.lower() for w in config.get("blocked_words", [])]
+    title = (deal.get("title") or "").lower()
+    return any(word in title for word in blocked_words)
+
+
+def blocked_words(count: int, rng: random.Random) -> list[str]:
+    words = {"réplica", "usado", "seminovo"}
+    while len(words) < count:
+        words.add("".join(rng.choices(string.ascii_lowercase + "áéíóúçãõ", k=rng.randint(4, 12))))
+    return sorted(words)
+
+
+def main() -> None:
+    rng = random.Random(3)
+    deals = [vars(d) for d in synthetic_deals(DEALS)]
+    for deal in deals[::10]:
+        deal["title"] += " usado"
+    for count in (100, 1_000, 10_000):
+        config = {"blocked_words": blocked_words(count, rng), "min_discount_percent": 20}
+
+        start = time.perf_counter()
+        expected = [legacy_blocked(deal, config) for deal in deals]
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rules = compile_rules(config)
+        compile_time = time.perf_counter() - start
+        start = time.perf_counter()
+        results = [score_deal(deal, config, None, rules) for deal in deals]
+        compiled = time.perf_counter() - start
+
+        assert [r.reasons.count("Contém palavra bloqueada") == 1 for r in results] == expected
+        print(
+            f"{count:>6} words  legacy blocked-word check {legacy / DEALS * 1e6:9.1f}us/deal  "
+            f"compiled full score_deal {compiled / DEALS * 1e6:7.1f}us/deal  (compile once {compile_time * 1000:.1f}ms)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""/deals?q= search: LIKE '%q%' scan vs the deals_fts index on a large deals table.
+
+Run from the repository root: python -m backend.benchmarks.search [rows]
+"""
+from __future__ import annotations
+
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from ..db import SCHEMA_SQL, run_migrations
+from ..utils import fts_match_query
+
+WORDS = (
+    "tênis notebook gamer placa vídeo rtx mouse teclado mecânico monitor cadeira fone bluetooth air fryer "
+    "panela geladeira smartphone camiseta jaqueta mochila relógio câmera console controle ssd memória"
+).split()
+BRANDS = ["New Balance", "Nike", "Mondial", "Samsung", "Logitech", "Asus", "Dell", "Philco", "Adidas", "Xiaomi"]
+QUERIES = ["tenis", "placa video", "Geladeira Philco", "rtx 5060", "kamora", "tênis velaro"]
+SYLLABLES = ["ka", "mo", "ra", "ve", "la", "ro", "ti", "na", "su", "be", "lo", "ne", "pa", "di", "xo"]
+
+
+def _populate(conn: sqlite3.Connection, rows: int) -> None:
+    rng = random.Random(5)
+    # Long-tail vocabulary (3375 words) so most terms are as selective as real product names.
+    vocabulary = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+    batch = []
+    for i in range(rows):
+        title = " ".join(rng.sample(WORDS, 2) + rng.sample(vocabulary, 3))
+        title += f" {rng.choice(['RTX 5060', 'X' + str(i % 5000), 'Pro', 'Max'])}"
+        batch.append(
+            (
+                "mercadolivre", f"MLB{i}", title, f"https://x/{i}", rng.uniform(10, 5000), rng.choice(BRANDS),
+                f"seller{i % 900}", rng.randrange(101), "pending_approval", f"2026-01-01T00:00:{i:09d}", "x",
+            )
+        )
+        if len(batch) == 50_000:
+            _insert(conn, batch)
+            batch = []
+    _insert(conn, batch)
+    conn.commit()
+
+
+def _insert(conn: sqlite3.Connection, batch: list[tuple]) -> None:
+    conn.executemany(
+        "INSERT INTO deals(source,product_id,title,url,current_price,brand,seller_name,score,status,created_at,updated_at) "
+        "VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+        batch,
+    )
+
+
+def _time(conn: sqlite3.Connection, sql: str, params: tuple, repeat: int = 5) -> tuple[float, int]:
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(conn.execute(sql, params).fetchall())
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(Path(tmp) / "search.db")
+        conn.executescript(SCHEMA_SQL)
+        run_migrations(conn)
+        start = time.perf_counter()
+        _populate(conn, rows)
+        print(f"populated {rows} deals (with FTS triggers) in {time.perf_counter() - start:.1f}s")
+        for q in QUERIES:
+            like, like_count = _time(
+                conn, "SELECT * FROM deals WHERE title LIKE ? ORDER BY created_at DESC LIMIT 300", (f"%{q}%",)
+            )
+            fts, fts_count = _time(
+                conn,
+                "SELECT d.* FROM deals d JOIN deals_fts ON deals_fts.rowid = d.id AND deals_fts MATCH ? "
+                "ORDER BY bm25(deals_fts, 10.0, 5.0, 5.0, 1.0), d.created_at DESC LIMIT 300",
+                (fts_match_query(q),),
+            )
+            print(f"{q!r:<20} LIKE {like * 1000:8.1f}ms ({like_count:3d} rows)   FTS {fts * 1000:8.1f}ms ({fts_count:3d} rows)")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import zlib
+from typing import Any
+
+from .utils import json_dump, json_load, now_utc
+
+
+logger = logging.getLogger("smartdeals.blobs")
+CODEC = "zlib"
+BACKFILL_CHUNK = 2000
+
+
+def canonical_json(data: Any) -> bytes:
+    # Key order must not change the hash, otherwise identical payloads would not dedupe.
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def payload_hash(raw: bytes) -> str:
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def encode_payload(data: Any) -> tuple[str, int, bytes]:
+    raw = canonical_json(data)
+    return payload_hash(raw), len(raw), zlib.compress(raw, 6)
+
+
+def decode_payload(codec: str, data: bytes) -> Any:
+    if codec != CODEC:
+        raise ValueError(f"Codec de payload desconhecido: {codec}")
+    return json.loads(zlib.decompress(data))
+
+
+def split_metadata(metadata: dict[str, Any] | None) -> tuple[dict[str, Any], Any]:
+    metadata = dict(metadata or {})
+    return metadata, metadata.pop("raw", None)
+
+
+def store_payloads(conn: sqlite3.Connection, payloads: list[Any]) -> list[str | None]:
+    refs: list[str | None] = []
+    rows: dict[str, tuple] = {}
+    created = now_utc().isoformat()
+    for payload in payloads:
+        if payload is None:
+            refs.append(None)
+            continue
+        digest, size, data = encode_payload(payload)
+        refs.append(digest)
+        rows.setdefault(digest, (digest, CODEC, size, data, created))
+    if rows:
+        conn.executemany(
+            "INSERT OR IGNORE INTO raw_payloads(hash, codec, raw_size, data, created_at) VALUES (?,?,?,?,?)",
+            list(rows.values()),
+        )
+    return refs
+
+
+def load_payload(conn: sqlite3.Connection, ref: str) -> Any:
+    row = conn.execute("SELECT codec, data FROM raw_payloads WHERE hash=?", (ref,)).fetchone()
+    return decode_payload(row["codec"], row["data"]) if row else None
+
+
+def prune_orphans(conn: sqlite3.Connection) -> int:
+    cur = conn.execute("DELETE FROM raw_payloads WHERE hash NOT IN (SELECT raw_ref FROM deals WHERE raw_ref IS NOT NULL)")
+    return cur.rowcount
+
+
+def move_raw_payloads(conn: sqlite3.Connection) -> int:
+    moved = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, metadata FROM deals WHERE id>? AND raw_ref IS NULL AND metadata LIKE '%\"raw\"%' ORDER BY id LIMIT ?",
+            (last_id, BACKFILL_CHUNK),
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        split = [split_metadata(json_load(r[1], {})) for r in rows]
+        refs = store_payloads(conn, [raw for _, raw in split])
+        conn.executemany(
+            "UPDATE deals SET metadata=?, raw_ref=? WHERE id=?",
+            [(json_dump(meta), ref, r[0]) for r, (meta, _), ref in zip(rows, split, refs)],
+        )
+        moved += sum(1 for ref in refs if ref)
+    logger.info("Moved %s raw payloads out of deals.metadata", moved)
+    return moved
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+from .config import settings
+from .models import DealInput
+from .sources.amazon import fetch_amazon_deals
+from .sources.mercadolivre import fetch_mercadolivre_deals
+
+logger = logging.getLogger("smartdeals.collector")
+
+# Each source is called as fetch(config, sink, persist); persist=False must leave no scan state behind.
+SOURCES = {
+    "mercadolivre": fetch_mercadolivre_deals,
+    "amazon": fetch_amazon_deals,
+}
+
+
+async def collect_deals(
+    config: dict[str, Any],
+    deadline: float | None = None,
+    sources: tuple[str, ...] | None = None,
+    persist: bool = True,
+) -> tuple[list[DealInput], dict]:
+    deadline = settings.scan_deadline_seconds if deadline is None else deadline
+    selected = {name: fetch for name, fetch in SOURCES.items() if sources is None or name in sources}
+    # Sources append to their sink as each request finishes, so a source cancelled
+    # at the deadline still contributes whatever it already fetched.
+    sinks: dict[str, list[DealInput]] = {name: [] for name in selected}
+    tasks = {name: asyncio.create_task(fetch(config, sinks[name], persist)) for name, fetch in selected.items()}
+
+    _, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    stats: dict[str, dict] = {}
+    for name, task in tasks.items():
+        error = None
+        if task in pending:
+            logger.warning("Source %s hit the %ss scan deadline with %s items", name, deadline, len(sinks[name]))
+        elif task.exception() is not None:
+            error = f"{type(task.exception()).__name__}: {task.exception()}"
+            logger.warning("Source %s failed: %s", name, task.exception())
+        stats[name] = {"count": len(sinks[name]), "complete": task not in pending and error is None}
+        if error:
+            stats[name]["error"] = error
+
+    incoming = [deal for name in selected for deal in sinks[name]]
+    return incoming, stats
@@ -0,0 +1,66 @@
+"""One-shot storage compaction: moves raw payloads out of deals, drops orphaned blobs and VACUUMs.
+
+Run from the repository root (with the API stopped): python -m backend.compact
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+from pathlib import Path
+
+from .blobs import prune_orphans
+from .config import settings
+from .db import init_db
+
+
+def _size(path: str) -> int:
+    return sum(p.stat().st_size for p in (Path(path), Path(path + "-wal")) if p.exists())
+
+
+def _stats(conn: sqlite3.Connection) -> dict[str, int]:
+    deals_bytes = conn.execute(
+        "SELECT COALESCE(SUM(LENGTH(metadata)), 0), COUNT(*) FROM deals"
+    ).fetchone()
+    blobs = conn.execute("SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM raw_payloads").fetchone()
+    return {
+        "metadata_bytes": deals_bytes[0],
+        "deals": deals_bytes[1],
+        "blobs": blobs[0],
+        "blob_raw_bytes": blobs[1],
+        "blob_stored_bytes": blobs[2],
+    }
+
+
+def compact(path: str) -> dict:
+    before = _size(path)
+    init_db()
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            pruned = prune_orphans(conn)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        stats = _stats(conn)
+    finally:
+        conn.close()
+    return {"before_bytes": before, "after_bytes": _size(path), "pruned_blobs": pruned, **stats}
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    report = compact(settings.db_path)
+    mib = 1024 * 1024
+    saved = report["before_bytes"] - report["after_bytes"]
+    print(f"banco: {settings.db_path}")
+    print(f"antes:  {report['before_bytes'] / mib:10.2f} MiB")
+    print(f"depois: {report['after_bytes'] / mib:10.2f} MiB  ({saved / mib:.2f} MiB liberados)")
+    print(f"deals: {report['deals']}  metadata restante: {report['metadata_bytes'] / mib:.2f} MiB")
+    print(
+        f"payloads: {report['blobs']} blobs, {report['blob_raw_bytes'] / mib:.2f} MiB JSON -> "
+        f"{report['blob_stored_bytes'] / mib:.2f} MiB comprimido; órfãos removidos: {report['pruned_blobs']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+from .config import settings
+
+# asyncio primitives are bound to the loop that first uses them, so keep one set per loop.
+_host_semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]] = weakref.WeakKeyDictionary()
+
+
+def host_limit(host: str) -> int:
+    return max(1, int(settings.host_concurrency.get(host, settings.host_concurrency_default)))
+
+
+@asynccontextmanager
+async def host_slot(url: str):
+    host = urlsplit(url).hostname or ""
+    semaphores = _host_semaphores.setdefault(asyncio.get_running_loop(), {})
+    sem = semaphores.get(host)
+    if sem is None:
+        sem = semaphores[host] = asyncio.Semaphore(host_limit(host))
+    async with sem:
+        yield
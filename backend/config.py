@@ -12,9 +12,43 @@ class Settings(BaseSettings):
 
     db_path: str = "data/smartdeals.db"
     logs_path: str = "data/smartdeals.log"
+    db_pool_size: int = 4
+    db_busy_timeout_ms: int = 5000
+    db_cache_size_kib: int = 16384
+    db_mmap_size_bytes: int = 268435456
 
     scheduler_interval_minutes: int = 20
+    source_intervals_minutes: dict[str, float] = {"mercadolivre": 20, "amazon": 180}
+    scheduler_jitter_seconds: int = 60
+    scheduler_misfire_grace_seconds: int = 300
+    refresh_interval_minutes: float = 5
+    price_history_retention_days: int = 90
     request_timeout_seconds: int = 15
+    scan_deadline_seconds: int = 60
+    host_concurrency_default: int = 4
+    host_concurrency: dict[str, int] = {
+        "api.mercadolibre.com": 8,
+        "www.amazon.com.br": 2,
+        "api.telegram.org": 1,
+        "graph.facebook.com": 16,
+    }
+    host_timeouts: dict[str, float] = {"api.telegram.org": 20, "graph.facebook.com": 20}
+    http2_enabled: bool = True
+    http_keepalive_seconds: float = 60
+    http_cache_ttl_seconds: dict[str, float] = {"mercadolivre": 600, "amazon": 3600}
+    http_cache_default_ttl_seconds: float = 600
+    http_cache_max_bytes: int = 64 * 1024 * 1024
+    http_cache_negative_ttl_seconds: float = 300
+    http_cache_negative_max_seconds: float = 6 * 3600
+    http_cache_transient_ttl_seconds: float = 30
+    publish_concurrency: int = 32
+    outbox_workers: int = 2
+    outbox_batch_size: int = 25
+    outbox_max_attempts: int = 6
+    outbox_backoff_base_seconds: float = 2
+    outbox_backoff_max_seconds: float = 600
+    outbox_lease_seconds: float = 120
+    outbox_poll_seconds: float = 5
 
 
 settings = Settings()
\ No newline at end of file
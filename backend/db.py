@@ -1,14 +1,21 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import queue
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from pathlib import Path
+from typing import Any, Callable, TypeVar
 
 from .config import settings
+from .utils import now_utc
 
 
 logger = logging.getLogger("smartdeals.db")
+T = TypeVar("T")
 SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS app_config (
     id INTEGER PRIMARY KEY CHECK (id = 1),
@@ -69,6 +76,15 @@ CREATE TABLE IF NOT EXISTS posts (
     FOREIGN KEY(deal_id) REFERENCES deals(id)
 );
 
+CREATE TABLE IF NOT EXISTS crawl_cursors (
+    source TEXT NOT NULL,
+    query_key TEXT NOT NULL,
+    next_offset INTEGER NOT NULL DEFAULT 0,
+    head_fingerprint TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (source, query_key)
+);
+
 CREATE TABLE IF NOT EXISTS scan_runs (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     started_at TEXT NOT NULL,
@@ -80,20 +96,477 @@ CREATE TABLE IF NOT EXISTS scan_runs (
 """
 
 
+SCHEMA_VERSION_SQL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TEXT NOT NULL
+);
+"""
+
+# Ordered schema changes applied on top of SCHEMA_SQL. Append new steps; never edit applied ones.
+# A step is either an SQL script or a callable taking the open connection.
+MIGRATIONS: list[tuple[int, str, str | Callable[[sqlite3.Connection], None]]] = [
+    (
+        1,
+        "hot path indexes",
+        """
+        CREATE INDEX IF NOT EXISTS idx_deals_similarity_key ON deals(similarity_key);
+        CREATE INDEX IF NOT EXISTS idx_price_history_product ON deal_price_history(deal_source, product_id, captured_at, price);
+        CREATE INDEX IF NOT EXISTS idx_deals_publish ON deals(status, posted_at, score DESC);
+        CREATE INDEX IF NOT EXISTS idx_deals_created ON deals(created_at);
+        CREATE INDEX IF NOT EXISTS idx_posts_created ON posts(created_at);
+        """,
+    ),
+    (2, "config version", "ALTER TABLE app_config ADD COLUMN version INTEGER NOT NULL DEFAULT 1;"),
+    (
+        3,
+        "near-duplicate signatures",
+        """
+        CREATE TABLE IF NOT EXISTS deal_signatures (
+            deal_source TEXT NOT NULL,
+            product_id TEXT NOT NULL,
+            signature BLOB NOT NULL,
+            shingles TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (deal_source, product_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_deal_signatures_created ON deal_signatures(created_at);
+        """,
+    ),
+    (4, "accent-folded similarity keys and signature backfill", lambda conn: _backfill_signatures(conn)),
+    (
+        5,
+        "deals full-text index",
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS deals_fts USING fts5(
+            title, brand, model, seller_name,
+            content='deals', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        );
+        CREATE TRIGGER IF NOT EXISTS deals_fts_insert AFTER INSERT ON deals BEGIN
+            INSERT INTO deals_fts(rowid, title, brand, model, seller_name)
+            VALUES (new.id, new.title, new.brand, new.model, new.seller_name);
+        END;
+        CREATE TRIGGER IF NOT EXISTS deals_fts_delete AFTER DELETE ON deals BEGIN
+            INSERT INTO deals_fts(deals_fts, rowid, title, brand, model, seller_name)
+            VALUES ('delete', old.id, old.title, old.brand, old.model, old.seller_name);
+        END;
+        CREATE TRIGGER IF NOT EXISTS deals_fts_update AFTER UPDATE OF title, brand, model, seller_name ON deals BEGIN
+            INSERT INTO deals_fts(deals_fts, rowid, title, brand, model, seller_name)
+            VALUES ('delete', old.id, old.title, old.brand, old.model, old.seller_name);
+            INSERT INTO deals_fts(rowid, title, brand, model, seller_name)
+            VALUES (new.id, new.title, new.brand, new.model, new.seller_name);
+        END;
+        INSERT INTO deals_fts(deals_fts) VALUES ('rebuild');
+        """,
+    ),
+    (6, "scan runs keyset index", "CREATE INDEX IF NOT EXISTS idx_scan_runs_started ON scan_runs(started_at);"),
+    (
+        7,
+        "raw payload blobs",
+        """
+        CREATE TABLE IF NOT EXISTS raw_payloads (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            raw_size INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            created_at TEXT NOT NULL
+        ) WITHOUT ROWID;
+        ALTER TABLE deals ADD COLUMN raw_ref TEXT;
+        CREATE INDEX IF NOT EXISTS idx_deals_raw_ref ON deals(raw_ref);
+        """,
+    ),
+    (8, "move raw payloads out of deals", lambda conn: _move_raw_payloads(conn)),
+    (
+        9,
+        "publication outbox",
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            deal_id INTEGER NOT NULL,
+            channel TEXT NOT NULL,
+            recipient TEXT NOT NULL DEFAULT '',
+            message TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TEXT NOT NULL,
+            external_id TEXT,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            FOREIGN KEY(deal_id) REFERENCES deals(id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at);
+        """,
+    ),
+    (
+        10,
+        "posting ledger",
+        """
+        CREATE TABLE IF NOT EXISTS post_ledger_daily (
+            day TEXT PRIMARY KEY,
+            posted INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS post_ledger_keys (
+            similarity_key TEXT PRIMARY KEY,
+            last_posted_at TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS deals_post_ledger AFTER UPDATE OF posted_at ON deals
+        WHEN new.posted_at IS NOT NULL AND old.posted_at IS NOT new.posted_at
+        BEGIN
+            INSERT INTO post_ledger_daily(day, posted) VALUES (substr(new.posted_at, 1, 10), 1)
+            ON CONFLICT(day) DO UPDATE SET posted = posted + 1;
+            INSERT INTO post_ledger_keys(similarity_key, last_posted_at)
+            SELECT new.similarity_key, new.posted_at WHERE new.similarity_key IS NOT NULL
+            ON CONFLICT(similarity_key) DO UPDATE SET last_posted_at = max(last_posted_at, excluded.last_posted_at);
+        END;
+        INSERT OR REPLACE INTO post_ledger_daily(day, posted)
+        SELECT substr(posted_at, 1, 10), COUNT(*) FROM deals WHERE posted_at IS NOT NULL GROUP BY 1;
+        INSERT OR REPLACE INTO post_ledger_keys(similarity_key, last_posted_at)
+        SELECT similarity_key, MAX(posted_at) FROM deals
+        WHERE posted_at IS NOT NULL AND similarity_key IS NOT NULL GROUP BY 1;
+        """,
+    ),
+    (
+        11,
+        "source http cache",
+        """
+        CREATE TABLE IF NOT EXISTS http_cache (
+            key TEXT PRIMARY KEY,
+            source TEXT NOT NULL,
+            url TEXT NOT NULL,
+            status INTEGER NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            body BLOB,
+            size INTEGER NOT NULL DEFAULT 0,
+            fetched_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            last_used_at REAL NOT NULL,
+            failures INTEGER NOT NULL DEFAULT 0,
+            negative_until REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_http_cache_lru ON http_cache(last_used_at);
+        """,
+    ),
+    (
+        12,
+        "tracked item refresh schedule",
+        """
+        CREATE TABLE IF NOT EXISTS item_refresh (
+            deal_id INTEGER PRIMARY KEY,
+            interval_minutes REAL NOT NULL,
+            next_refresh_at TEXT NOT NULL,
+            checks INTEGER NOT NULL DEFAULT 0,
+            changes INTEGER NOT NULL DEFAULT 0,
+            last_checked_at TEXT,
+            FOREIGN KEY(deal_id) REFERENCES deals(id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_item_refresh_due ON item_refresh(next_refresh_at);
+        """,
+    ),
+    (
+        13,
+        "daily price rollup",
+        """
+        CREATE TABLE IF NOT EXISTS price_daily (
+            deal_source TEXT NOT NULL,
+            product_id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            min_price REAL NOT NULL,
+            max_price REAL NOT NULL,
+            last_price REAL NOT NULL,
+            last_at TEXT NOT NULL,
+            points INTEGER NOT NULL,
+            price_sum REAL NOT NULL,
+            PRIMARY KEY (deal_source, product_id, day)
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS price_history_rollup AFTER INSERT ON deal_price_history
+        BEGIN
+            INSERT INTO price_daily(deal_source, product_id, day, min_price, max_price, last_price, last_at, points, price_sum)
+            VALUES (new.deal_source, new.product_id, substr(new.captured_at, 1, 10), new.price, new.price, new.price, new.captured_at, 1, new.price)
+            ON CONFLICT(deal_source, product_id, day) DO UPDATE SET
+                min_price = min(min_price, excluded.min_price),
+                max_price = max(max_price, excluded.max_price),
+                last_price = CASE WHEN excluded.last_at >= last_at THEN excluded.last_price ELSE last_price END,
+                last_at = max(last_at, excluded.last_at),
+                points = points + 1,
+                price_sum = price_sum + excluded.price_sum;
+        END;
+        INSERT OR REPLACE INTO price_daily(deal_source, product_id, day, min_price, max_price, last_price, last_at, points, price_sum)
+        SELECT deal_source, product_id, day, MIN(price), MAX(price), MAX(CASE WHEN newest = 1 THEN price END), MAX(captured_at), COUNT(*), SUM(price)
+        FROM (
+            SELECT deal_source, product_id, substr(captured_at, 1, 10) AS day, price, captured_at,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY deal_source, product_id, substr(captured_at, 1, 10) ORDER BY captured_at DESC, id DESC
+                   ) AS newest
+            FROM deal_price_history
+        )
+        GROUP BY deal_source, product_id, day;
+        CREATE INDEX IF NOT EXISTS idx_price_history_captured ON deal_price_history(captured_at);
+        """,
+    ),
+]
+
+
+def _backfill_signatures(conn: sqlite3.Connection) -> None:
+    from .dedup import backfill_signatures
+
+    backfill_signatures(conn)
+
+
+def _move_raw_payloads(conn: sqlite3.Connection) -> None:
+    from .blobs import move_raw_payloads
+
+    move_raw_payloads(conn)
+
+
+# Queries on hot paths, checked with EXPLAIN QUERY PLAN at startup so a missing index shows up in the logs.
+KNOWN_QUERIES: dict[str, tuple[str, tuple]] = {
+    "near_duplicate": (
+        "SELECT DISTINCT d.similarity_key FROM json_each(?) AS k JOIN deals d ON d.similarity_key=k.value",
+        ("[]",),
+    ),
+    "price_stats_30d": (
+        "SELECT SUM(price_sum) / SUM(points), MIN(min_price) FROM price_daily WHERE deal_source=? AND product_id=? AND day>=?",
+        ("", "", ""),
+    ),
+    "last_price_point": (
+        "SELECT MAX(last_at) FROM price_daily WHERE deal_source=? AND product_id=?",
+        ("", ""),
+    ),
+    "prune_price_history": ("SELECT id FROM deal_price_history WHERE captured_at<? LIMIT ?", ("", 5000)),
+    "list_deals": (
+        "SELECT id, created_at FROM deals WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+        ("", 0, 101),
+    ),
+    "list_posts": (
+        "SELECT id, created_at FROM posts WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+        ("", 0, 101),
+    ),
+    "outbox_due": (
+        "SELECT id FROM outbox WHERE status IN ('pending','sending') AND next_attempt_at<=? ORDER BY next_attempt_at LIMIT ?",
+        ("", 25),
+    ),
+    "posted_today": ("SELECT posted FROM post_ledger_daily WHERE day=?", ("",)),
+    "autopost_candidates": (
+        "SELECT * FROM (SELECT d.*, ROW_NUMBER() OVER (PARTITION BY COALESCE(d.similarity_key, d.id) ORDER BY d.score DESC, d.id) AS key_rank "
+        "FROM deals d LEFT JOIN post_ledger_keys k ON k.similarity_key = d.similarity_key "
+        "WHERE d.status='approved' AND d.posted_at IS NULL AND (k.last_posted_at IS NULL OR k.last_posted_at < ?)) "
+        "WHERE key_rank = 1 ORDER BY score DESC, id LIMIT ?",
+        ("", 15),
+    ),
+    "list_runs": (
+        "SELECT id, started_at FROM scan_runs WHERE (started_at, id) < (?, ?) ORDER BY started_at DESC, id DESC LIMIT ?",
+        ("", 0, 101),
+    ),
+    "http_cache_lru": ("SELECT key, size FROM http_cache ORDER BY last_used_at", ()),
+    "refresh_due": (
+        "SELECT d.id FROM (SELECT id FROM deals WHERE status IN (SELECT value FROM json_each(?)) "
+        "UNION ALL SELECT id FROM deals WHERE status='posted' AND posted_at>=?) AS t "
+        "JOIN deals d ON d.id=t.id LEFT JOIN item_refresh r ON r.deal_id=d.id "
+        "WHERE d.source='mercadolivre' AND (r.next_refresh_at IS NULL OR r.next_refresh_at<=?)",
+        ("[]", "", ""),
+    ),
+}
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    conn.executescript(SCHEMA_VERSION_SQL)
+    current = schema_version(conn)
+    for version, name, step in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info("Applying migration %s: %s", version, name)
+        if callable(step):
+            with conn:
+                step(conn)
+                conn.execute(
+                    "INSERT INTO schema_version(version, name, applied_at) VALUES (?,?,?)",
+                    (version, name, now_utc().isoformat()),
+                )
+        else:
+            conn.executescript(
+                f"BEGIN;\n{step}\nINSERT INTO schema_version(version, name, applied_at) "
+                f"VALUES ({int(version)}, '{name.replace(chr(39), chr(39) * 2)}', '{now_utc().isoformat()}');\nCOMMIT;"
+            )
+        current = version
+    return current
+
+
+def full_scans(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> list[str]:
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    # "SCAN (subquery-N)" walks the rows an inner query already produced; that inner query's own
+    # table accesses are listed (and checked) separately.
+    return [
+        row[3]
+        for row in plan
+        if row[3].startswith(("SCAN ", "SEARCH "))
+        and " USING " not in row[3]
+        and "VIRTUAL TABLE" not in row[3]
+        and not row[3].startswith("SCAN (subquery-")
+    ]
+
+
+def check_query_plans(conn: sqlite3.Connection) -> dict[str, list[str]]:
+    problems = {}
+    for name, (sql, params) in KNOWN_QUERIES.items():
+        scans = full_scans(conn, sql, params)
+        if scans:
+            problems[name] = scans
+            logger.warning("Query %s does a full scan: %s", name, "; ".join(scans))
+    return problems
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=settings.db_busy_timeout_ms / 1000)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout={int(settings.db_busy_timeout_ms)}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{int(settings.db_cache_size_kib)}")
+    conn.execute(f"PRAGMA mmap_size={int(settings.db_mmap_size_bytes)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def _release(conn: sqlite3.Connection) -> None:
+    # Match the old close-per-call behaviour: work a caller did not commit is discarded.
+    if conn.in_transaction:
+        conn.rollback()
+
+
+class ConnectionPool:
+    def __init__(self, path: str, readers: int) -> None:
+        self.path = path
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(readers)
+        self._writer: sqlite3.Connection | None = None
+        self._writer_lock = threading.RLock()
+        self._closed = False
+
+    @contextmanager
+    def reader(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = _connect(self.path)
+                conn.execute("PRAGMA query_only=ON")
+            try:
+                yield conn
+            finally:
+                _release(conn)
+                if self._closed:
+                    conn.close()
+                else:
+                    self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def writer(self):
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = _connect(self.path)
+            try:
+                yield self._writer
+            finally:
+                _release(self._writer)
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.path != settings.db_path:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(settings.db_path, settings.db_pool_size)
+        return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
 def init_db() -> None:
     db_dir = Path(settings.db_path).parent
     db_dir.mkdir(parents=True, exist_ok=True)
-    with sqlite3.connect(settings.db_path) as conn:
+    conn = sqlite3.connect(settings.db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
         conn.executescript(SCHEMA_SQL)
-        conn.commit()
-    logger.info("DB init ok: %s", settings.db_path)
+        version = run_migrations(conn)
+        check_query_plans(conn)
+    finally:
+        conn.close()
+    logger.info("DB init ok: %s (schema v%s)", settings.db_path, version)
 
 
 @contextmanager
 def get_conn():
-    conn = sqlite3.connect(settings.db_path)
-    conn.row_factory = sqlite3.Row
-    try:
+    with get_pool().reader() as conn:
         yield conn
-    finally:
-        conn.close()
\ No newline at end of file
+
+
+@contextmanager
+def get_write_conn():
+    with get_pool().writer() as conn:
+        yield conn
+
+
+# Async code never touches sqlite3 directly: reads run on a small reader pool and all
+# writes are serialised on one thread that owns the writer connection.
+_read_executor = ThreadPoolExecutor(max_workers=settings.db_pool_size, thread_name_prefix="smartdeals-db-read")
+_write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smartdeals-db-write")
+
+
+def _read(fn: Callable[..., T], args: tuple) -> T:
+    with get_conn() as conn:
+        return fn(conn, *args)
+
+
+def _write(fn: Callable[..., T], args: tuple) -> T:
+    with get_write_conn() as conn:
+        result = fn(conn, *args)
+        conn.commit()
+        return result
+
+
+async def db_read(fn: Callable[..., T], *args: Any) -> T:
+    return await asyncio.get_running_loop().run_in_executor(_read_executor, _read, fn, args)
+
+
+async def db_write(fn: Callable[..., T], *args: Any) -> T:
+    return await asyncio.get_running_loop().run_in_executor(_write_executor, _write, fn, args)
+
+
+async def db_call(fn: Callable[..., T], *args: Any) -> T:
+    return await asyncio.get_running_loop().run_in_executor(_read_executor, fn, *args)
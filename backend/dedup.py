@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from array import array
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from .utils import now_utc, similarity_key, slugify_text
+
+logger = logging.getLogger("smartdeals.dedup")
+
+NUM_PERM = 64
+# 10 bands of 6 rows put the LSH S-curve around J=0.68: pairs at J=0.8 become candidates ~95%
+# of the time, pairs at J=0.4 about 4%, which keeps candidate sets small.
+BANDS = 10
+ROWS = 6
+
+Signature = tuple[int, ...]
+Shingles = frozenset[str]
+
+
+def shingles(title: str, brand: str | None = None, model: str | None = None) -> Shingles:
+    return frozenset(slugify_text(f"{title} {brand or ''} {model or ''}").split())
+
+
+@lru_cache(maxsize=65536)
+def _token_hashes(token: str) -> array:
+    # Each 32-bit word of the XOF output acts as one independent hash function, so a single
+    # digest per token yields all NUM_PERM hashes. Stable across restarts, unlike hash().
+    hashes = array("I")
+    hashes.frombytes(hashlib.shake_128(token.encode("utf-8")).digest(NUM_PERM * hashes.itemsize))
+    return hashes
+
+
+def minhash(tokens: Shingles) -> Signature | None:
+    if not tokens:
+        return None
+    return tuple(map(min, zip(*(_token_hashes(t) for t in tokens))))
+
+
+def jaccard(a: Shingles, b: Shingles) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def pack(signature: Signature) -> bytes:
+    return array("I", signature).tobytes()
+
+
+def unpack(blob: bytes) -> Signature:
+    values = array("I")
+    values.frombytes(blob)
+    return tuple(values)
+
+
+def _bands(signature: Signature):
+    for band in range(BANDS):
+        yield band, signature[band * ROWS : (band + 1) * ROWS]
+
+
+def pack_shingles(tokens: Shingles) -> str:
+    return " ".join(sorted(tokens))
+
+
+class NearDuplicateIndex:
+    # LSH buckets over MinHash signatures of recent deals pick candidates in sub-linear time;
+    # candidates are then confirmed with the exact Jaccard similarity of their title shingles.
+    # Loaded lazily from deal_signatures and reloaded daily so old deals leave the window.
+    RELOAD_AFTER = timedelta(hours=24)
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: dict[tuple[int, Signature], set[tuple[str, str]]] = {}
+        self._shingles: dict[tuple[str, str], Shingles] = {}
+        self._loaded_at: datetime | None = None
+        self._window_days: int | None = None
+
+    def ensure_loaded(self, conn, window_days: int) -> None:
+        with self._lock:
+            fresh = self._loaded_at is not None and now_utc() - self._loaded_at < self.RELOAD_AFTER
+            if fresh and self._window_days == window_days:
+                return
+            since = (now_utc() - timedelta(days=window_days)).isoformat()
+            rows = conn.execute(
+                "SELECT deal_source, product_id, signature, shingles FROM deal_signatures WHERE created_at>=?",
+                (since,),
+            ).fetchall()
+            self._buckets, self._shingles = {}, {}
+            for row in rows:
+                key = (row["deal_source"], row["product_id"])
+                self._add(key, frozenset(row["shingles"].split()), unpack(row["signature"]))
+            self._loaded_at, self._window_days = now_utc(), window_days
+        logger.info("Near-duplicate index loaded with %s signatures (%s days)", len(rows), window_days)
+
+    def _add(self, key: tuple[str, str], tokens: Shingles, signature: Signature) -> None:
+        self._shingles[key] = tokens
+        for band in _bands(signature):
+            self._buckets.setdefault(band, set()).add(key)
+
+    def add(self, key: tuple[str, str], tokens: Shingles, signature: Signature) -> None:
+        with self._lock:
+            self._add(key, tokens, signature)
+
+    def find(self, tokens: Shingles, signature: Signature, threshold: float) -> tuple[tuple[str, str], float] | None:
+        with self._lock:
+            candidates: set[tuple[str, str]] = set()
+            for band in _bands(signature):
+                candidates |= self._buckets.get(band, set())
+            best = None
+            for key in candidates:
+                score = jaccard(tokens, self._shingles[key])
+                if score >= threshold and (best is None or score > best[1]):
+                    best = (key, score)
+            return best
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets, self._shingles, self._loaded_at = {}, {}, None
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+
+near_duplicates = NearDuplicateIndex()
+
+
+def backfill_signatures(conn) -> None:
+    # Recompute similarity keys too: slugify_text now folds accents, so old keys for accented titles changed.
+    rows = conn.execute("SELECT id, source, product_id, title, brand, model, created_at FROM deals").fetchall()
+    keys, signatures = [], []
+    for row in rows:
+        title, brand, model = row[3], row[4], row[5]
+        keys.append((similarity_key(title, brand, model), row[0]))
+        tokens = shingles(title, brand, model)
+        signature = minhash(tokens)
+        if signature is not None:
+            signatures.append((row[1], row[2], pack(signature), pack_shingles(tokens), row[6]))
+    conn.executemany("UPDATE deals SET similarity_key=? WHERE id=?", keys)
+    conn.executemany(
+        "INSERT OR REPLACE INTO deal_signatures(deal_source, product_id, signature, shingles, created_at) VALUES (?,?,?,?,?)",
+        signatures,
+    )
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import json
+import logging
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+from .concurrency import host_slot
+from .config import settings
+from .db import db_read, db_write
+from .http_client import http_clients
+
+
+logger = logging.getLogger("smartdeals.http_cache")
+_offline: contextvars.ContextVar[bool] = contextvars.ContextVar("http_cache_offline", default=False)
+# Only a listing that is gone earns the exponential backoff; timeouts, 429s and 5xx clear up on their own.
+GONE_STATUSES = {404, 410}
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    status: int
+    etag: str | None
+    last_modified: str | None
+    body: bytes
+    expires_at: float
+    failures: int
+    negative_until: float
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+    def json(self):
+        return json.loads(self.body)
+
+
+@contextmanager
+def offline_mode():
+    # Everything awaited inside (including tasks created there) is served from the cache only.
+    token = _offline.set(True)
+    try:
+        yield
+    finally:
+        _offline.reset(token)
+
+
+def is_offline() -> bool:
+    return _offline.get()
+
+
+def cache_key(url: str, params: dict | None = None) -> str:
+    full = f"{url}?{urlencode(sorted((params or {}).items()))}" if params else url
+    return hashlib.blake2b(full.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def source_ttl(source: str) -> float:
+    return float(settings.http_cache_ttl_seconds.get(source, settings.http_cache_default_ttl_seconds))
+
+
+def lookup(conn, key: str) -> CacheEntry | None:
+    row = conn.execute(
+        "SELECT key, status, etag, last_modified, body, expires_at, failures, negative_until FROM http_cache WHERE key=?",
+        (key,),
+    ).fetchone()
+    if row is None:
+        return None
+    return CacheEntry(
+        key=row["key"],
+        status=row["status"],
+        etag=row["etag"],
+        last_modified=row["last_modified"],
+        body=zlib.decompress(row["body"]) if row["body"] else b"",
+        expires_at=row["expires_at"],
+        failures=row["failures"],
+        negative_until=row["negative_until"],
+    )
+
+
+def store(conn, key: str, source: str, url: str, status: int, etag: str | None, last_modified: str | None, body: bytes) -> None:
+    now = time.time()
+    data = zlib.compress(body, 6)
+    conn.execute(
+        """
+        INSERT INTO http_cache(key, source, url, status, etag, last_modified, body, size, fetched_at, expires_at, last_used_at, failures, negative_until)
+        VALUES (?,?,?,?,?,?,?,?,?,?,?,0,0)
+        ON CONFLICT(key) DO UPDATE SET
+            status=excluded.status, etag=excluded.etag, last_modified=excluded.last_modified, body=excluded.body,
+            size=excluded.size, fetched_at=excluded.fetched_at, expires_at=excluded.expires_at,
+            last_used_at=excluded.last_used_at, failures=0, negative_until=0
+        """,
+        (key, source, url, status, etag, last_modified, data, len(data), now, now + source_ttl(source), now),
+    )
+    enforce_budget(conn)
+
+
+def revalidated(conn, key: str, source: str) -> None:
+    now = time.time()
+    conn.execute(
+        "UPDATE http_cache SET expires_at=?, last_used_at=?, failures=0, negative_until=0 WHERE key=?",
+        (now + source_ttl(source), now, key),
+    )
+
+
+def touch(conn, key: str) -> None:
+    conn.execute("UPDATE http_cache SET last_used_at=? WHERE key=?", (time.time(), key))
+
+
+def record_failure(conn, key: str, source: str, url: str, status: int) -> float:
+    # Repeated failures back off exponentially so a dead link stops costing a request every scan.
+    row = conn.execute("SELECT failures FROM http_cache WHERE key=?", (key,)).fetchone()
+    failures = (row["failures"] if row else 0) + 1
+    if status in GONE_STATUSES:
+        delay = min(settings.http_cache_negative_max_seconds, settings.http_cache_negative_ttl_seconds * 2 ** (failures - 1))
+    else:
+        delay = settings.http_cache_transient_ttl_seconds
+    now = time.time()
+    conn.execute(
+        """
+        INSERT INTO http_cache(key, source, url, status, body, size, fetched_at, expires_at, last_used_at, failures, negative_until)
+        VALUES (?,?,?,?,NULL,0,?,0,?,?,?)
+        ON CONFLICT(key) DO UPDATE SET failures=excluded.failures, negative_until=excluded.negative_until, last_used_at=excluded.last_used_at
+        """,
+        (key, source, url, status, now, now, failures, now + delay),
+    )
+    return delay
+
+
+def enforce_budget(conn) -> int:
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()[0]
+    if total <= settings.http_cache_max_bytes:
+        return 0
+    evicted = 0
+    rows = conn.execute("SELECT key, size FROM http_cache ORDER BY last_used_at").fetchall()
+    doomed = []
+    for row in rows:
+        if total <= settings.http_cache_max_bytes * 0.9:
+            break
+        doomed.append((row["key"],))
+        total -= row["size"]
+        evicted += 1
+    conn.executemany("DELETE FROM http_cache WHERE key=?", doomed)
+    return evicted
+
+
+def conditional_headers(entry: CacheEntry | None) -> dict[str, str]:
+    if entry is None or not entry.body:
+        return {}
+    headers = {}
+    if entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    return headers
+
+
+async def cached_get(source: str, url: str, params: dict | None = None, headers: dict | None = None) -> CacheEntry | None:
+    key = cache_key(url, params)
+    entry = await db_read(lookup, key)
+    usable = entry is not None and bool(entry.body)
+    if is_offline():
+        return entry if usable else None
+    if entry is not None and entry.negative_until > time.time():
+        return None
+    if usable and entry.fresh:
+        await db_write(touch, key)
+        return entry
+
+    async with host_slot(url):
+        try:
+            resp = await http_clients.get(url).get(url, params=params, headers={**(headers or {}), **conditional_headers(entry)})
+        except Exception as exc:
+            logger.info("Fetch failed for %s: %s", url, exc)
+            await db_write(record_failure, key, source, url, 0)
+            return None
+    if resp.status_code == 304 and usable:
+        await db_write(revalidated, key, source)
+        return entry
+    if resp.status_code >= 400:
+        await db_write(record_failure, key, source, url, resp.status_code)
+        return None
+    fresh = CacheEntry(
+        key=key,
+        status=resp.status_code,
+        etag=resp.headers.get("ETag"),
+        last_modified=resp.headers.get("Last-Modified"),
+        body=resp.content,
+        expires_at=time.time() + source_ttl(source),
+        failures=0,
+        negative_until=0,
+    )
+    await db_write(store, key, source, url, fresh.status, fresh.etag, fresh.last_modified, fresh.body)
+    return fresh
+
+
+def cache_summary(conn) -> dict:
+    row = conn.execute(
+        "SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes, "
+        "COALESCE(SUM(negative_until > ?), 0) AS negative FROM http_cache",
+        (time.time(),),
+    ).fetchone()
+    return {"entries": row["entries"], "bytes": row["bytes"], "negative": row["negative"], "max_bytes": settings.http_cache_max_bytes}
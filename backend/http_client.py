@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import importlib.util
+import logging
+from urllib.parse import urlsplit
+
+import httpx
+
+from .concurrency import host_limit
+from .config import settings
+
+logger = logging.getLogger("smartdeals.http")
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def host_timeout(host: str) -> float:
+    return float(settings.host_timeouts.get(host, settings.request_timeout_seconds))
+
+
+class HttpClients:
+    def __init__(self) -> None:
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def _build(self, host: str) -> httpx.AsyncClient:
+        limit = host_limit(host)
+        return httpx.AsyncClient(
+            http2=settings.http2_enabled and HTTP2_AVAILABLE,
+            timeout=host_timeout(host),
+            limits=httpx.Limits(
+                max_connections=limit,
+                max_keepalive_connections=limit,
+                keepalive_expiry=settings.http_keepalive_seconds,
+            ),
+        )
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = self._clients[key] = self._build(parts.hostname or "")
+        return client
+
+    async def aclose(self) -> None:
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+        logger.info("Closed %s pooled HTTP clients", len(clients))
+
+
+http_clients = HttpClients()
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from .blobs import split_metadata, store_payloads
+from .dedup import NearDuplicateIndex, Shingles, Signature, minhash, near_duplicates, pack, pack_shingles, shingles
+from .models import DealInput, ScoreResult
+from .price_stats import price_stats_30d
+from .scoring import score_deals_batch
+from .utils import json_dump, now_utc, similarity_key
+
+OPEN_STATUSES = ("new", "scored", "pending_approval")
+
+
+def status_for(result: ScoreResult, cfg: dict) -> str:
+    status = "pending_approval" if cfg.get("mode", "MANUAL") == "MANUAL" else "scored"
+    if cfg.get("mode") == "AUTO" and result.score >= int(cfg.get("approval_threshold", 70)):
+        status = "approved"
+    return status
+
+
+SCORING_COLUMNS = (
+    "id, source, product_id, title, condition, seller_reputation, current_price, old_price, "
+    "is_official_store, sold_quantity, shipping_free, status"
+)
+
+
+def _rescore_rows(conn, rows: list[dict], cfg: dict) -> int:
+    stats = price_stats_30d(conn, {(r["source"], r["product_id"]) for r in rows})
+    per_row = [stats.get((r["source"], r["product_id"])) for r in rows]
+    results = score_deals_batch(rows, cfg, [s.avg_price if s else None for s in per_row], price_stats=per_row)
+    updated = now_utc().isoformat()
+    conn.executemany(
+        """
+        UPDATE deals SET score=?, reasons=?, verdict=?, discount_percent=?, scored_at=?, status=?, updated_at=?
+        WHERE id=?
+        """,
+        [
+            (
+                result.score,
+                json_dump(result.reasons),
+                result.verdict,
+                result.discount_percent,
+                result.scored_at.isoformat(),
+                status_for(result, cfg) if row["status"] in OPEN_STATUSES else row["status"],
+                updated,
+                row["id"],
+            )
+            for row, result in zip(rows, results)
+        ],
+    )
+    return len(rows)
+
+
+def rescore_deals(conn, deal_ids: set[int], cfg: dict) -> int:
+    if not deal_ids:
+        return 0
+    rows = conn.execute(
+        f"SELECT {SCORING_COLUMNS} FROM deals WHERE id IN (SELECT value FROM json_each(?))",
+        (json_dump(sorted(deal_ids)),),
+    ).fetchall()
+    return _rescore_rows(conn, [dict(r) for r in rows], cfg)
+
+
+def rescore_all(conn, cfg: dict, chunk_size: int = 5000) -> int:
+    total = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            f"SELECT {SCORING_COLUMNS} FROM deals WHERE id>? ORDER BY id LIMIT ?",
+            (last_id, chunk_size),
+        ).fetchall()
+        if not rows:
+            return total
+        total += _rescore_rows(conn, [dict(r) for r in rows], cfg)
+        last_id = rows[-1]["id"]
+
+
+def _known_deals(conn, incoming: list[DealInput]) -> dict[tuple[str, str], dict]:
+    keys = json_dump(sorted({(d.source, d.product_id) for d in incoming}))
+    rows = conn.execute(
+        """
+        SELECT d.id, d.source, d.product_id, d.current_price, d.old_price,
+               (SELECT MAX(p.last_at) FROM price_daily p
+                WHERE p.deal_source=d.source AND p.product_id=d.product_id) AS last_captured_at
+        FROM json_each(?) AS k
+        JOIN deals d ON d.source=json_extract(k.value, '$[0]') AND d.product_id=json_extract(k.value, '$[1]')
+        """,
+        (keys,),
+    ).fetchall()
+    return {(r["source"], r["product_id"]): dict(r) for r in rows}
+
+
+def _existing_similarity_keys(conn, keys: set[str]) -> set[str]:
+    if not keys:
+        return set()
+    rows = conn.execute(
+        "SELECT DISTINCT d.similarity_key FROM json_each(?) AS k JOIN deals d ON d.similarity_key=k.value",
+        (json_dump(sorted(keys)),),
+    ).fetchall()
+    return {r["similarity_key"] for r in rows}
+
+
+def upsert_known_deals(conn, incoming: list[DealInput], cfg: dict) -> tuple[list[DealInput], dict]:
+    tracking = cfg.get("price_tracking") or {}
+    heartbeat = timedelta(hours=float(tracking.get("heartbeat_hours", 24)))
+    rescore_threshold = float(tracking.get("rescore_threshold_percent", 5))
+
+    known = _known_deals(conn, incoming)
+    fresh: list[DealInput] = []
+    history_rows: list[tuple] = []
+    deal_updates: list[tuple] = []
+    rescore_ids: set[int] = set()
+    now = now_utc()
+    captured = now.isoformat()
+
+    for d in incoming:
+        row = known.get((d.source, d.product_id))
+        if row is None:
+            fresh.append(d)
+            continue
+        # Sources that cannot read a price (e.g. the light Amazon probe) report 0.
+        if not d.current_price or d.current_price <= 0:
+            continue
+        previous = float(row["current_price"] or 0)
+        changed = d.current_price != previous
+        last_captured = row["last_captured_at"]
+        stale = last_captured is None or datetime.fromisoformat(last_captured) <= now - heartbeat
+        if not changed and not stale:
+            continue
+
+        history_rows.append((d.source, d.product_id, d.current_price, captured))
+        row["last_captured_at"] = captured
+        if not changed:
+            continue
+        old_price = d.old_price if d.old_price else row["old_price"]
+        deal_updates.append((d.current_price, old_price, captured, row["id"]))
+        if previous <= 0 or abs(d.current_price - previous) / previous * 100 >= rescore_threshold:
+            rescore_ids.add(row["id"])
+        row["current_price"] = d.current_price
+        row["old_price"] = old_price
+
+    if history_rows:
+        conn.executemany(
+            "INSERT INTO deal_price_history(deal_source,product_id,price,captured_at) VALUES (?,?,?,?)",
+            history_rows,
+        )
+    if deal_updates:
+        conn.executemany(
+            "UPDATE deals SET current_price=?, old_price=?, updated_at=? WHERE id=?",
+            deal_updates,
+        )
+    rescore_deals(conn, rescore_ids, cfg)
+
+    stats = {"price_points": len(history_rows), "price_updates": len(deal_updates), "rescored": len(rescore_ids)}
+    return fresh, stats
+
+
+def ingest_deals(conn, incoming: list[DealInput], cfg: dict) -> dict:
+    fresh, stats = upsert_known_deals(conn, incoming, cfg)
+
+    candidates: list[tuple[DealInput, str]] = []
+    seen_products: set[tuple[str, str]] = set()
+    for d in fresh:
+        if d.current_price and (d.current_price < cfg.get("price_min", 0) or d.current_price > cfg.get("price_max", 1e9)):
+            continue
+        if (d.source, d.product_id) in seen_products:
+            continue
+        seen_products.add((d.source, d.product_id))
+        candidates.append((d, similarity_key(d.title, d.brand, d.model)))
+
+    dedup_cfg = cfg.get("dedup") or {}
+    threshold = float(dedup_cfg.get("similarity_threshold", 0.8))
+    near_check = bool(dedup_cfg.get("near_duplicates", True))
+    if near_check:
+        near_duplicates.ensure_loaded(conn, int(dedup_cfg.get("window_days", 30)))
+
+    taken_keys = _existing_similarity_keys(conn, {key for _, key in candidates})
+    accepted: list[tuple[DealInput, str]] = []
+    signature_rows: list[tuple] = []
+    # This batch's signatures stay out of the shared index until the rows are committed, so a
+    # rolled-back ingest cannot leave entries behind that would reject the same products on retry.
+    batch_index = NearDuplicateIndex()
+    additions: list[tuple[tuple[str, str], Shingles, Signature]] = []
+    near_dup_count = 0
+    created = now_utc().isoformat()
+    for d, sim_key in candidates:
+        if sim_key in taken_keys:
+            continue
+        # With the near-duplicate check off there are no shingles, so minhash returns None.
+        tokens = shingles(d.title, d.brand, d.model) if near_check else frozenset()
+        signature = minhash(tokens)
+        if signature is not None:
+            if near_duplicates.find(tokens, signature, threshold) or batch_index.find(tokens, signature, threshold):
+                near_dup_count += 1
+                continue
+            batch_index.add((d.source, d.product_id), tokens, signature)
+            additions.append(((d.source, d.product_id), tokens, signature))
+            signature_rows.append((d.source, d.product_id, pack(signature), pack_shingles(tokens), created))
+        taken_keys.add(sim_key)
+        accepted.append((d, sim_key))
+
+    # The first history point is the listing's own price, so its 30-day average is that price.
+    results = score_deals_batch([vars(d) for d, _ in accepted], cfg, [d.current_price or None for d, _ in accepted])
+    split = [split_metadata(d.metadata) for d, _ in accepted]
+    raw_refs = store_payloads(conn, [raw for _, raw in split])
+    deal_rows: list[tuple] = []
+    history_rows: list[tuple] = []
+    for (d, sim_key), result, (metadata, _), raw_ref in zip(accepted, results, split, raw_refs):
+        deal_rows.append(
+            (
+                d.source,
+                d.product_id,
+                sim_key,
+                d.title,
+                d.url,
+                d.current_price,
+                d.old_price,
+                d.currency,
+                d.seller_name,
+                d.seller_reputation,
+                int(d.is_official_store),
+                int(d.shipping_free),
+                d.sold_quantity,
+                d.condition,
+                d.category,
+                d.image_url,
+                d.brand,
+                d.model,
+                d.coupon,
+                json_dump(metadata),
+                raw_ref,
+                result.score,
+                json_dump(result.reasons),
+                result.verdict,
+                result.discount_percent,
+                result.scored_at.isoformat(),
+                status_for(result, cfg),
+                created,
+                created,
+            )
+        )
+        history_rows.append((d.source, d.product_id, d.current_price, created))
+
+    conn.executemany(
+        """
+        INSERT INTO deals(source,product_id,similarity_key,title,url,current_price,old_price,currency,seller_name,seller_reputation,
+        is_official_store,shipping_free,sold_quantity,condition,category,image_url,brand,model,coupon,metadata,
+        raw_ref,score,reasons,verdict,discount_percent,scored_at,status,created_at,updated_at)
+        VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+        """,
+        deal_rows,
+    )
+    conn.executemany(
+        "INSERT INTO deal_price_history(deal_source,product_id,price,captured_at) VALUES (?,?,?,?)",
+        history_rows,
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO deal_signatures(deal_source, product_id, signature, shingles, created_at) VALUES (?,?,?,?,?)",
+        signature_rows,
+    )
+    conn.commit()
+    for key, tokens, signature in additions:
+        near_duplicates.add(key, tokens, signature)
+    return {"new": len(deal_rows), "scored": len(deal_rows), "near_duplicates": near_dup_count, **stats}
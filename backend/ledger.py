@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from .utils import now_utc
+
+# post_ledger_daily / post_ledger_keys are maintained by the deals_post_ledger trigger whenever
+# deals.posted_at is set, so every lookup here is a primary-key read. Days are UTC dates.
+
+
+def _day(when: datetime | None = None) -> str:
+    return (when or now_utc()).date().isoformat()
+
+
+def posted_on(conn, when: datetime | None = None) -> int:
+    row = conn.execute("SELECT posted FROM post_ledger_daily WHERE day=?", (_day(when),)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def autopost_candidates(conn, cfg: dict) -> list[dict]:
+    remaining = int(cfg.get("daily_post_limit", 15)) - posted_on(conn)
+    if remaining <= 0:
+        return []
+    since = (now_utc() - timedelta(days=int(cfg.get("cooldown_days", 7)))).isoformat()
+    # Best-scored deal per similarity key, skipping keys still in cooldown.
+    rows = conn.execute(
+        """
+        SELECT * FROM (
+            SELECT d.*, ROW_NUMBER() OVER (
+                PARTITION BY COALESCE(d.similarity_key, d.id) ORDER BY d.score DESC, d.id
+            ) AS key_rank
+            FROM deals d LEFT JOIN post_ledger_keys k ON k.similarity_key = d.similarity_key
+            WHERE d.status='approved' AND d.posted_at IS NULL AND (k.last_posted_at IS NULL OR k.last_posted_at < ?)
+        )
+        WHERE key_rank = 1 ORDER BY score DESC, id LIMIT ?
+        """,
+        (since, remaining),
+    ).fetchall()
+    return [{k: r[k] for k in r.keys() if k != "key_rank"} for r in rows]
+
+
+def ledger_summary(conn, cfg: dict) -> dict:
+    posted = posted_on(conn)
+    limit = int(cfg.get("daily_post_limit", 15))
+    return {"day": _day(), "posted_today": posted, "daily_post_limit": limit, "remaining": max(0, limit - posted)}
@@ -1,22 +1,31 @@
 from __future__ import annotations
 
 import logging
-from datetime import datetime, timedelta, timezone
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
 
-from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, HTTPException, Query, Response
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
 
+from .app_config import get_config, save_config
+from .blobs import load_payload
+from .collector import collect_deals
 from .config import settings
-from .db import get_conn, init_db
-from .formatter import format_post_message
-from .poster.telegram import post_to_telegram
-from .poster.whatsapp import post_whatsapp
-from .scoring import score_deal
-from .scheduler import start_scheduler
+from .db import close_pool, db_call, db_read, db_write, get_conn, get_write_conn, init_db
+from .http_cache import cache_summary, offline_mode
+from .http_client import http_clients
+from .ingest import ingest_deals, rescore_all
+from .ledger import ledger_summary
+from .pagination import DEALS, POSTS, RUNS, Listing, keyset_page
+from .outbox import outbox_summary, outbox_worker
+from .publisher import autopublish, publish_deals, send_job
+from .ratelimit import rate_limiter
+from .refresh import refresh_summary, refresh_tracked
+from .scheduler import scan_runner, start_scheduler
 from .security import get_current_user, login
-from .sources.amazon import fetch_amazon_deals
-from .sources.mercadolivre import fetch_mercadolivre_deals
-from .utils import json_dump, json_load, now_utc, similarity_key
+from .utils import fts_match_query, json_dump, now_utc
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger("smartdeals")
@@ -28,215 +37,76 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
-def default_config() -> dict:
-    return {
-        "mode": "MANUAL",
-        "approval_threshold": 70,
-        "categories_allowed": ["gamer", "moda", "casa"],
-        "blocked_words": ["réplica", "usado", "seminovo"],
-        "price_min": 10,
-        "price_max": 15000,
-        "min_discount_percent": 20,
-        "cooldown_days": 7,
-        "daily_post_limit": 15,
-        "seed_keywords": ["RTX 5060", "Tênis New Balance"],
-        "seed_categories": [],
-        "mercadolivre": {"client_id": "", "client_secret": "", "redirect_uri": "", "refresh_token": "", "access_token": ""},
-        "amazon": {"pa_api_access_key": "", "pa_api_secret": "", "partner_tag": "", "region": "BR", "manual_links": []},
-        "telegram": {"bot_token": "", "chat_id": ""},
-        "whatsapp": {"provider": "draft", "phone_number_id": "", "token": "", "to_numbers": []},
-    }
+def _start_run(conn, started: str) -> int:
+    cur = conn.execute("INSERT INTO scan_runs(started_at,status) VALUES (?,?)", (started, "running"))
+    return cur.lastrowid
 
 
-def get_config() -> dict:
-    with get_conn() as conn:
-        row = conn.execute("SELECT payload FROM app_config WHERE id=1").fetchone()
-        if not row:
-            cfg = default_config()
-            conn.execute(
-                "INSERT INTO app_config(id, payload, updated_at) VALUES (1, ?, ?)",
-                (json_dump(cfg), now_utc().isoformat()),
-            )
-            conn.commit()
-            return cfg
-        return json_load(row["payload"], default_config())
-
-
-def save_config(payload: dict) -> dict:
-    current = get_config()
-    current.update(payload)
-    with get_conn() as conn:
-        conn.execute(
-            "UPDATE app_config SET payload=?, updated_at=? WHERE id=1",
-            (json_dump(current), now_utc().isoformat()),
-        )
-        conn.commit()
-    return current
+def _finish_run(conn, run_id: int, message: str, stats: dict) -> None:
+    conn.execute(
+        "UPDATE scan_runs SET finished_at=?, status=?, message=?, stats=? WHERE id=?",
+        (now_utc().isoformat(), "finished", message, json_dump(stats), run_id),
+    )
 
 
-def avg_price_last_30_days(conn, source: str, product_id: str) -> float | None:
-    since = (now_utc() - timedelta(days=30)).isoformat()
-    row = conn.execute(
-        "SELECT AVG(price) AS avg_price FROM deal_price_history WHERE deal_source=? AND product_id=? AND captured_at>=?",
-        (source, product_id, since),
-    ).fetchone()
-    return float(row["avg_price"]) if row and row["avg_price"] else None
+def _get_deal(conn, deal_id: int) -> dict | None:
+    row = conn.execute("SELECT * FROM deals WHERE id=?", (deal_id,)).fetchone()
+    return dict(row) if row else None
 
 
-def apply_scoring(conn, deal_id: int, cfg: dict):
-    deal = conn.execute("SELECT * FROM deals WHERE id=?", (deal_id,)).fetchone()
-    if not deal:
-        return
-    avg_price = avg_price_last_30_days(conn, deal["source"], deal["product_id"])
-    result = score_deal(dict(deal), cfg, avg_price)
-    status = "pending_approval" if cfg.get("mode", "MANUAL") == "MANUAL" else "scored"
-    if cfg.get("mode") == "AUTO" and result.score >= int(cfg.get("approval_threshold", 70)):
-        status = "approved"
-    conn.execute(
-        """
-        UPDATE deals SET score=?, reasons=?, verdict=?, discount_percent=?, scored_at=?, status=?, updated_at=?
-        WHERE id=?
-        """,
-        (
-            result.score,
-            json_dump(result.reasons),
-            result.verdict,
-            result.discount_percent,
-            result.scored_at.isoformat(),
-            status,
-            now_utc().isoformat(),
-            deal_id,
-        ),
-    )
+def _raw_payload(conn, deal_id: int) -> dict | None:
+    row = conn.execute("SELECT raw_ref FROM deals WHERE id=?", (deal_id,)).fetchone()
+    if row is None:
+        return None
+    return {"raw_ref": row["raw_ref"], "raw": load_payload(conn, row["raw_ref"]) if row["raw_ref"] else None}
 
 
-async def collect_and_process() -> dict:
-    cfg = get_config()
-    started = now_utc().isoformat()
-    with get_conn() as conn:
-        cur = conn.execute("INSERT INTO scan_runs(started_at,status) VALUES (?,?)", (started, "running"))
-        run_id = cur.lastrowid
-        conn.commit()
+def _approve(conn, deal_id: int) -> dict | None:
+    conn.execute("UPDATE deals SET status='approved', updated_at=? WHERE id=?", (now_utc().isoformat(), deal_id))
+    return _get_deal(conn, deal_id)
 
-    ml_deals = await fetch_mercadolivre_deals(cfg)
-    amazon_deals = await fetch_amazon_deals(cfg)
-    incoming = ml_deals + amazon_deals
 
-    new_count = 0
-    scored_count = 0
-    with get_conn() as conn:
-        for d in incoming:
-            if d.current_price and (d.current_price < cfg.get("price_min", 0) or d.current_price > cfg.get("price_max", 1e9)):
-                continue
-            created = now_utc().isoformat()
-            sim_key = similarity_key(d.title, d.brand, d.model)
-            exists = conn.execute(
-                "SELECT id FROM deals WHERE source=? AND product_id=?",
-                (d.source, d.product_id),
-            ).fetchone()
-            if exists:
-                continue
-            near_dup = conn.execute("SELECT id FROM deals WHERE similarity_key=?", (sim_key,)).fetchone()
-            if near_dup:
-                continue
-            cur = conn.execute(
-                """
-                INSERT INTO deals(source,product_id,similarity_key,title,url,current_price,old_price,currency,seller_name,seller_reputation,
-                is_official_store,shipping_free,sold_quantity,condition,category,image_url,brand,model,coupon,metadata,status,created_at,updated_at)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-                """,
-                (
-                    d.source,
-                    d.product_id,
-                    sim_key,
-                    d.title,
-                    d.url,
-                    d.current_price,
-                    d.old_price,
-                    d.currency,
-                    d.seller_name,
-                    d.seller_reputation,
-                    int(d.is_official_store),
-                    int(d.shipping_free),
-                    d.sold_quantity,
-                    d.condition,
-                    d.category,
-                    d.image_url,
-                    d.brand,
-                    d.model,
-                    d.coupon,
-                    json_dump(d.metadata or {}),
-                    "new",
-                    created,
-                    created,
-                ),
-            )
-            new_count += 1
-            deal_id = cur.lastrowid
-            conn.execute(
-                "INSERT INTO deal_price_history(deal_source,product_id,price,captured_at) VALUES (?,?,?,?)",
-                (d.source, d.product_id, d.current_price, created),
-            )
-            apply_scoring(conn, deal_id, cfg)
-            scored_count += 1
-
-        if cfg.get("mode") == "AUTO":
-            deals = conn.execute(
-                "SELECT * FROM deals WHERE status='approved' AND posted_at IS NULL ORDER BY score DESC LIMIT ?",
-                (int(cfg.get("daily_post_limit", 15)),),
-            ).fetchall()
-            for deal in deals:
-                await publish_deal(conn, dict(deal), cfg)
-
-        conn.execute(
-            "UPDATE scan_runs SET finished_at=?, status=?, message=?, stats=? WHERE id=?",
-            (now_utc().isoformat(), "finished", "ok", json_dump({"new": new_count, "scored": scored_count}), run_id),
-        )
-        conn.commit()
+async def collect_and_process(sources: tuple[str, ...] | None = None) -> dict:
+    cfg = get_config()
+    run_id = await db_write(_start_run, now_utc().isoformat())
 
-    return {"new": new_count, "scored": scored_count}
+    incoming, source_stats = await collect_deals(cfg, sources=sources)
+    partial = not all(s["complete"] for s in source_stats.values())
 
+    stats = await db_write(ingest_deals, incoming, cfg)
 
-async def publish_deal(conn, deal: dict, cfg: dict) -> dict:
-    payload = dict(deal)
-    payload["reasons"] = json_load(payload.get("reasons"), [])
-    message = format_post_message(payload)
+    if cfg.get("mode") == "AUTO":
+        await autopublish(cfg)
 
-    telegram_status, telegram_external = await post_to_telegram(message, cfg.get("telegram", {}))
-    conn.execute(
-        "INSERT INTO posts(deal_id,channel,status,external_id,payload,created_at) VALUES (?,?,?,?,?,?)",
-        (deal["id"], "telegram", telegram_status, telegram_external, json_dump({"message": message}), now_utc().isoformat()),
-    )
+    await db_write(_finish_run, run_id, "partial" if partial else "ok", {**stats, "sources": source_stats})
+    return {**stats, "partial": partial}
 
-    wa_results = await post_whatsapp(message, cfg.get("whatsapp", {}))
-    for item in wa_results:
-        conn.execute(
-            "INSERT INTO posts(deal_id,channel,status,external_id,payload,created_at) VALUES (?,?,?,?,?,?)",
-            (
-                deal["id"],
-                "whatsapp",
-                item["status"],
-                item["external_id"],
-                json_dump({"message": message}),
-                now_utc().isoformat(),
-            ),
-        )
 
-    conn.execute("UPDATE deals SET posted_at=?, status=?, updated_at=? WHERE id=?", (now_utc().isoformat(), "posted", now_utc().isoformat(), deal["id"]))
-    return {"telegram": telegram_status, "whatsapp": wa_results}
+async def publish_deal(deal: dict, cfg: dict) -> dict:
+    results = await publish_deals([deal], cfg)
+    return results[0]
 
 
 @app.on_event("startup")
 async def startup_event():
-    init_db()
-    get_config()
+    await db_call(init_db)
+    await db_call(get_config)
     logger.info("Tables/config ensured")
+    outbox_worker.start(send_job)
     start_scheduler(collect_and_process)
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await outbox_worker.stop()
+    await http_clients.aclose()
+    close_pool()
+
+
 @app.get("/health")
 def health():
     return {"status": "ok", "time": datetime.now(timezone.utc).isoformat()}
@@ -253,70 +123,127 @@ def read_config(_: str = Depends(get_current_user)):
 
 @app.put("/config")
 def update_config(payload: dict, _: str = Depends(get_current_user)):
-    return save_config(payload)
+    try:
+        return save_config(payload)
+    except ValidationError as exc:
+        raise HTTPException(422, exc.errors(include_url=False, include_context=False)) from exc
 
 
 @app.post("/sources/test")
-async def test_sources(_: str = Depends(get_current_user)):
+async def test_sources(offline: bool = False, _: str = Depends(get_current_user)):
     cfg = get_config()
-    ml = await fetch_mercadolivre_deals(cfg)
-    amz = await fetch_amazon_deals(cfg)
-    return {"mercadolivre_count": len(ml), "amazon_count": len(amz)}
+    # A dry run: nothing is ingested, so no crawl cursor moves either.
+    # offline=true replays whatever the HTTP cache holds, stale or not, without touching the network.
+    with offline_mode() if offline else nullcontext():
+        _, stats = await collect_deals(cfg, persist=False)
+    return {
+        "mercadolivre_count": stats["mercadolivre"]["count"],
+        "amazon_count": stats["amazon"]["count"],
+        "offline": offline,
+    }
 
 
 @app.post("/scan/run")
 async def run_scan(_: str = Depends(get_current_user)):
-    return await collect_and_process()
+    return await scan_runner.trigger(None, "manual")
+
+
+@app.post("/refresh/run")
+async def run_refresh(_: str = Depends(get_current_user)):
+    return await refresh_tracked()
+
+
+@app.get("/refresh")
+def refresh_status(_: str = Depends(get_current_user)):
+    with get_conn() as conn:
+        return refresh_summary(conn)
+
+
+def _listing_page(listing: Listing, fields: str | None, where: list[str], params: list, cursor: str | None, limit: int, response: Response) -> list[dict]:
+    try:
+        columns = listing.projection(fields)
+        with get_conn() as conn:
+            items, next_cursor = keyset_page(conn, listing, columns, where, params, cursor, limit)
+    except ValueError as exc:
+        raise HTTPException(422, str(exc)) from exc
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 
 @app.get("/deals")
 def list_deals(
+    response: Response,
     status: str | None = None,
     q: str | None = None,
     min_score: int | None = Query(None, ge=0, le=100),
     source: str | None = None,
+    fields: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=300),
     _: str = Depends(get_current_user),
 ):
-    query = "SELECT * FROM deals WHERE 1=1"
-    params = []
+    where, params = [], []
     if status:
-        query += " AND status=?"
+        where.append("status=?")
         params.append(status)
-    if q:
-        query += " AND title LIKE ?"
-        params.append(f"%{q}%")
     if min_score is not None:
-        query += " AND score>=?"
+        where.append("score>=?")
         params.append(min_score)
     if source:
-        query += " AND source=?"
+        where.append("source=?")
         params.append(source)
-    query += " ORDER BY created_at DESC LIMIT 300"
-
+    if not q:
+        return _listing_page(DEALS, fields, where, params, cursor, limit, response)
+
+    # Ranked search has no stable keyset, so it returns a single page.
+    if cursor:
+        raise HTTPException(422, "cursor não é suportado junto com q")
+    match = fts_match_query(q)
+    if not match:
+        return []
+    try:
+        columns = DEALS.projection(fields)
+    except ValueError as exc:
+        raise HTTPException(422, str(exc)) from exc
+    query = (
+        f"SELECT {', '.join('d.' + c for c in columns)} FROM deals d"
+        " JOIN deals_fts ON deals_fts.rowid = d.id AND deals_fts MATCH ?"
+    )
+    query += "".join(f" AND d.{clause}" for clause in where)
+    query += " ORDER BY bm25(deals_fts, 10.0, 5.0, 5.0, 1.0), d.created_at DESC LIMIT ?"
     with get_conn() as conn:
-        rows = conn.execute(query, tuple(params)).fetchall()
-        return [
-            {**dict(r), "reasons": json_load(r["reasons"], []), "metadata": json_load(r["metadata"], {})}
-            for r in rows
-        ]
+        rows = conn.execute(query, (match, *params, limit)).fetchall()
+    return [DEALS.decode_row(r) for r in rows]
+
+
+@app.post("/deals/rescore")
+async def rescore_deals(_: str = Depends(get_current_user)):
+    started = time.perf_counter()
+    count = await db_write(rescore_all, get_config())
+    return {"rescored": count, "seconds": round(time.perf_counter() - started, 3)}
+
+
+@app.get("/deals/{deal_id}/raw")
+async def deal_raw_payload(deal_id: int, _: str = Depends(get_current_user)):
+    deal = await db_read(_raw_payload, deal_id)
+    if deal is None:
+        raise HTTPException(404, "Deal não encontrado")
+    return deal
 
 
 @app.post("/deals/{deal_id}/approve")
 async def approve_deal(deal_id: int, _: str = Depends(get_current_user)):
-    with get_conn() as conn:
-        conn.execute("UPDATE deals SET status='approved', updated_at=? WHERE id=?", (now_utc().isoformat(), deal_id))
-        deal = conn.execute("SELECT * FROM deals WHERE id=?", (deal_id,)).fetchone()
-        if not deal:
-            raise HTTPException(404, "Deal não encontrado")
-        cfg = get_config()
-        result = await publish_deal(conn, dict(deal), cfg)
-        conn.commit()
-        return result
+    deal = await db_write(_approve, deal_id)
+    if not deal:
+        raise HTTPException(404, "Deal não encontrado")
+    cfg = get_config()
+    return await publish_deal(deal, cfg)
 
 
 @app.post("/deals/{deal_id}/reject")
 def reject_deal(deal_id: int, _: str = Depends(get_current_user)):
-    with get_conn() as conn:
+    with get_write_conn() as conn:
         conn.execute("UPDATE deals SET status='rejected', updated_at=? WHERE id=?", (now_utc().isoformat(), deal_id))
         conn.commit()
     return {"status": "rejected"}
@@ -325,24 +252,50 @@ def reject_deal(deal_id: int, _: str = Depends(get_current_user)):
 @app.post("/deals/{deal_id}/post")
 async def force_post(deal_id: int, _: str = Depends(get_current_user)):
     cfg = get_config()
-    with get_conn() as conn:
-        deal = conn.execute("SELECT * FROM deals WHERE id=?", (deal_id,)).fetchone()
-        if not deal:
-            raise HTTPException(404, "Deal não encontrado")
-        result = await publish_deal(conn, dict(deal), cfg)
-        conn.commit()
-        return result
+    deal = await db_read(_get_deal, deal_id)
+    if not deal:
+        raise HTTPException(404, "Deal não encontrado")
+    return await publish_deal(deal, cfg)
 
 
 @app.get("/posts")
-def list_posts(_: str = Depends(get_current_user)):
+def list_posts(
+    response: Response,
+    fields: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=300),
+    _: str = Depends(get_current_user),
+):
+    return _listing_page(POSTS, fields, [], [], cursor, limit, response)
+
+
+@app.get("/outbox")
+async def outbox_status(_: str = Depends(get_current_user)):
+    return await db_read(outbox_summary)
+
+
+@app.get("/ledger")
+async def posting_ledger(_: str = Depends(get_current_user)):
+    return await db_read(ledger_summary, get_config())
+
+
+@app.get("/ratelimits")
+def rate_limit_stats(_: str = Depends(get_current_user)):
+    return rate_limiter.stats()
+
+
+@app.get("/http-cache")
+def http_cache_status(_: str = Depends(get_current_user)):
     with get_conn() as conn:
-        rows = conn.execute("SELECT * FROM posts ORDER BY created_at DESC LIMIT 300").fetchall()
-        return [dict(r) for r in rows]
+        return cache_summary(conn)
 
 
 @app.get("/runs")
-def scan_runs(_: str = Depends(get_current_user)):
-    with get_conn() as conn:
-        rows = conn.execute("SELECT * FROM scan_runs ORDER BY id DESC LIMIT 100").fetchall()
-        return [{**dict(r), "stats": json_load(r["stats"], {})} for r in rows]
\ No newline at end of file
+def scan_runs(
+    response: Response,
+    fields: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=300),
+    _: str = Depends(get_current_user),
+):
+    return _listing_page(RUNS, fields, [], [], cursor, limit, response)
@@ -28,6 +28,14 @@ class DealInput:
     metadata: dict[str, Any] | None = None
 
 
+@dataclass
+class PriceStats:
+    avg_price: float | None
+    min_price: float | None
+    median_price: float | None
+    days: int
+
+
 @dataclass
 class ScoreResult:
     score: int
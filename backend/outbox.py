@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import random
+from datetime import timedelta
+from typing import Awaitable, Callable
+
+from .config import settings
+from .db import db_write
+from .poster.errors import RetryLater
+from .utils import json_dump, now_utc
+
+
+logger = logging.getLogger("smartdeals.outbox")
+SendFunc = Callable[[dict], Awaitable[tuple[str, str]]]
+
+
+def idempotency_key(deal_id: int, channel: str, recipient: str, message: str) -> str:
+    # The message is part of the key: re-publishing the same text is a no-op, a changed offer is a new post.
+    raw = f"{deal_id}|{channel}|{recipient}|{message}".encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def backoff_seconds(attempts: int, retry_after: float | None = None) -> float:
+    if retry_after is not None:
+        return retry_after + random.uniform(0, 1)
+    delay = min(settings.outbox_backoff_max_seconds, settings.outbox_backoff_base_seconds * 2 ** max(0, attempts - 1))
+    return random.uniform(delay / 2, delay)
+
+
+def enqueue(conn, jobs: list[tuple[int, str, str, str]]) -> list[str]:
+    # One outcome per job: "queued" for a new key, "requeued" when a job that gave up is reset for
+    # another round, "already_queued" when the same message is pending, in flight or sent.
+    now = now_utc().isoformat()
+    outcomes = []
+    for job in jobs:
+        key = idempotency_key(*job)
+        row = conn.execute("SELECT status FROM outbox WHERE idempotency_key=?", (key,)).fetchone()
+        if row is None:
+            conn.execute(
+                """
+                INSERT INTO outbox(idempotency_key, deal_id, channel, recipient, message, next_attempt_at, created_at, updated_at)
+                VALUES (?,?,?,?,?,?,?,?)
+                """,
+                (key, *job, now, now, now),
+            )
+            outcomes.append("queued")
+        elif row["status"] == "failed":
+            conn.execute(
+                "UPDATE outbox SET status='pending', attempts=0, next_attempt_at=?, last_error=NULL, updated_at=? WHERE idempotency_key=?",
+                (now, now, key),
+            )
+            outcomes.append("requeued")
+        else:
+            outcomes.append("already_queued")
+    return outcomes
+
+
+def claim_due(conn, limit: int) -> list[dict]:
+    # A claimed job gets a lease; if the process dies mid-send it becomes due again once the lease expires.
+    now = now_utc()
+    rows = conn.execute(
+        """
+        UPDATE outbox SET status='sending', attempts=attempts+1, next_attempt_at=?, updated_at=?
+        WHERE id IN (
+            SELECT id FROM outbox WHERE status IN ('pending','sending') AND next_attempt_at<=? ORDER BY next_attempt_at LIMIT ?
+        )
+        RETURNING id, deal_id, channel, recipient, message, attempts
+        """,
+        ((now + timedelta(seconds=settings.outbox_lease_seconds)).isoformat(), now.isoformat(), now.isoformat(), limit),
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def renew_leases(conn, jobs: list[dict]) -> None:
+    # Jobs can sit behind the send semaphore, a rate-limit bucket or a Retry-After pause for longer
+    # than one lease; extending it while the send is in flight stops another worker re-claiming them.
+    until = (now_utc() + timedelta(seconds=settings.outbox_lease_seconds)).isoformat()
+    conn.executemany(
+        "UPDATE outbox SET next_attempt_at=? WHERE id=? AND attempts=? AND status='sending'",
+        [(until, job["id"], job["attempts"]) for job in jobs],
+    )
+
+
+def _still_leased(conn, job: dict) -> bool:
+    # attempts is bumped by every claim, so it doubles as the lease token.
+    row = conn.execute("SELECT 1 FROM outbox WHERE id=? AND attempts=? AND status='sending'", (job["id"], job["attempts"])).fetchone()
+    return row is not None
+
+
+def record_results(conn, finished: list[tuple[dict, str, str]], retries: list[tuple[dict, float, str]]) -> int:
+    now = now_utc()
+    owned_finished = [item for item in finished if _still_leased(conn, item[0])]
+    owned_retries = [item for item in retries if _still_leased(conn, item[0])]
+    lost = len(finished) + len(retries) - len(owned_finished) - len(owned_retries)
+    if lost:
+        logger.warning("Dropped results for %s outbox jobs whose lease had passed to another worker", lost)
+    if owned_finished:
+        conn.executemany(
+            "UPDATE outbox SET status=?, external_id=?, last_error=NULL, updated_at=? WHERE id=?",
+            [("done" if status != "failed" else "failed", external_id, now.isoformat(), job["id"]) for job, status, external_id in owned_finished],
+        )
+        conn.executemany(
+            "INSERT INTO posts(deal_id,channel,status,external_id,payload,created_at) VALUES (?,?,?,?,?,?)",
+            [
+                (job["deal_id"], job["channel"], status, external_id, json_dump({"message": job["message"], "to": job["recipient"]}), now.isoformat())
+                for job, status, external_id in owned_finished
+            ],
+        )
+    if owned_retries:
+        conn.executemany(
+            "UPDATE outbox SET status='pending', next_attempt_at=?, last_error=?, updated_at=? WHERE id=?",
+            [((now + timedelta(seconds=delay)).isoformat(), error, now.isoformat(), job["id"]) for job, delay, error in owned_retries],
+        )
+    return lost
+
+
+def outbox_summary(conn) -> dict[str, int]:
+    rows = conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status").fetchall()
+    return {r["status"]: r["n"] for r in rows}
+
+
+class OutboxWorker:
+    def __init__(self) -> None:
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        self._send: SendFunc | None = None
+        self._sem: asyncio.Semaphore | None = None
+
+    def start(self, send: SendFunc) -> None:
+        if self._tasks:
+            return
+        self._send = send
+        self._wakeup = asyncio.Event()
+        self._sem = asyncio.Semaphore(max(1, settings.publish_concurrency))
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(max(1, settings.outbox_workers))]
+        logger.info("Outbox started with %s workers", len(self._tasks))
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, worker: int) -> None:
+        while True:
+            try:
+                drained = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Outbox worker %s failed", worker)
+                drained = 0
+            if drained:
+                continue
+            self._wakeup.clear()
+            # asyncio.wait rather than wait_for: on 3.11 wait_for can swallow a cancel that races a notify().
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=settings.outbox_poll_seconds)
+            finally:
+                waiter.cancel()
+
+    async def _attempt(self, job: dict) -> tuple[str, str] | Exception:
+        async with self._sem:
+            try:
+                return await self._send(job)
+            except Exception as exc:
+                return exc
+
+    async def _renew(self, in_flight: dict[int, dict]) -> None:
+        while True:
+            await asyncio.sleep(settings.outbox_lease_seconds / 3)
+            if in_flight:
+                await db_write(renew_leases, list(in_flight.values()))
+
+    async def drain_once(self) -> int:
+        jobs = await db_write(claim_due, settings.outbox_batch_size)
+        if not jobs:
+            return 0
+        in_flight = {job["id"]: job for job in jobs}
+
+        async def attempt(job: dict) -> tuple[str, str] | Exception:
+            try:
+                return await self._attempt(job)
+            finally:
+                in_flight.pop(job["id"], None)
+
+        renewer = asyncio.create_task(self._renew(in_flight))
+        try:
+            outcomes = await asyncio.gather(*(attempt(job) for job in jobs))
+        finally:
+            renewer.cancel()
+
+        finished: list[tuple[dict, str, str]] = []
+        retries: list[tuple[dict, float, str]] = []
+        for job, outcome in zip(jobs, outcomes):
+            if isinstance(outcome, tuple):
+                finished.append((job, *outcome))
+                continue
+            error = f"{type(outcome).__name__}: {outcome}"
+            if job["attempts"] >= settings.outbox_max_attempts:
+                logger.warning("Outbox job %s gave up after %s attempts: %s", job["id"], job["attempts"], error)
+                finished.append((job, "failed", error))
+            else:
+                retry_after = outcome.retry_after if isinstance(outcome, RetryLater) else None
+                retries.append((job, backoff_seconds(job["attempts"], retry_after), error))
+        await db_write(record_results, finished, retries)
+        return len(jobs)
+
+
+outbox_worker = OutboxWorker()
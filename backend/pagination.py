@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Any
+
+from .utils import json_load
+
+
+@dataclass(frozen=True)
+class Listing:
+    table: str
+    columns: tuple[str, ...]
+    time_column: str = "created_at"
+    heavy: frozenset[str] = frozenset()
+    json_columns: dict[str, Any] = field(default_factory=dict)
+
+    def projection(self, fields: str | None) -> list[str]:
+        if not fields:
+            return [c for c in self.columns if c not in self.heavy]
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in self.columns]
+        if unknown:
+            raise ValueError(f"Campos desconhecidos: {', '.join(unknown)}")
+        # The keyset columns are always returned so every page can produce its cursor.
+        keys = [c for c in ("id", self.time_column) if c not in requested]
+        return keys + list(dict.fromkeys(requested))
+
+    def decode_row(self, row) -> dict:
+        item = dict(row)
+        for name, default in self.json_columns.items():
+            if name in item:
+                item[name] = json_load(item[name], default)
+        return item
+
+
+DEALS = Listing(
+    table="deals",
+    columns=(
+        "id", "source", "product_id", "similarity_key", "title", "url", "current_price", "old_price",
+        "currency", "seller_name", "seller_reputation", "is_official_store", "shipping_free",
+        "sold_quantity", "condition", "category", "image_url", "brand", "model", "coupon", "metadata",
+        "raw_ref", "score", "reasons", "verdict", "discount_percent", "status", "created_at", "updated_at",
+        "scored_at", "posted_at",
+    ),
+    heavy=frozenset({"metadata"}),
+    json_columns={"reasons": [], "metadata": {}},
+)
+POSTS = Listing(
+    table="posts",
+    columns=("id", "deal_id", "channel", "status", "external_id", "payload", "created_at"),
+    heavy=frozenset({"payload"}),
+)
+RUNS = Listing(
+    table="scan_runs",
+    columns=("id", "started_at", "finished_at", "status", "message", "stats"),
+    time_column="started_at",
+    json_columns={"stats": {}},
+)
+
+
+def encode_cursor(created_at: str, row_id: int) -> str:
+    raw = json.dumps([created_at, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Cursor inválido") from exc
+    if not isinstance(created_at, str) or not isinstance(row_id, int):
+        raise ValueError("Cursor inválido")
+    return created_at, row_id
+
+
+def keyset_page(
+    conn,
+    listing: Listing,
+    columns: list[str],
+    where: list[str],
+    params: list,
+    cursor: str | None,
+    limit: int,
+) -> tuple[list[dict], str | None]:
+    where = list(where)
+    params = list(params)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        where.append(f"({listing.time_column}, id) < (?, ?)")
+        params += [created_at, row_id]
+    sql = f"SELECT {', '.join(columns)} FROM {listing.table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {listing.time_column} DESC, id DESC LIMIT ?"
+    # One extra row tells us whether another page exists without a COUNT.
+    rows = conn.execute(sql, (*params, limit + 1)).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][listing.time_column], rows[-1]["id"])
+    return [listing.decode_row(r) for r in rows], next_cursor
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-import httpx
+from ..concurrency import host_slot
+from ..http_client import http_clients
+from ..ratelimit import rate_limiter
+from .errors import RetryLater, retry_after_header
 
 
 async def post_to_telegram(message: str, cfg: dict) -> tuple[str, str]:
@@ -11,9 +14,19 @@ async def post_to_telegram(message: str, cfg: dict) -> tuple[str, str]:
 
     url = f"https://api.telegram.org/bot{token}/sendMessage"
     payload = {"chat_id": chat_id, "text": message, "disable_web_page_preview": False}
-    async with httpx.AsyncClient(timeout=20) as client:
-        resp = await client.post(url, json=payload)
+    await rate_limiter.acquire("telegram", str(chat_id))
+    async with host_slot(url):
+        resp = await http_clients.get(url).post(url, json=payload)
+    if resp.status_code == 429:
+        try:
+            retry_after = float(resp.json().get("parameters", {}).get("retry_after"))
+        except (TypeError, ValueError):
+            retry_after = retry_after_header(resp.headers.get("Retry-After"))
+        rate_limiter.penalize("telegram", str(chat_id), retry_after)
+        raise RetryLater(resp.text, retry_after)
+    if resp.status_code >= 500:
+        raise RetryLater(resp.text)
     if resp.status_code >= 400:
         return "failed", resp.text
     body = resp.json()
-    return "posted", str(body.get("result", {}).get("message_id", "ok"))
\ No newline at end of file
+    return "posted", str(body.get("result", {}).get("message_id", "ok"))
@@ -2,44 +2,58 @@ from __future__ import annotations
 
 from urllib.parse import quote
 
-import httpx
+from ..concurrency import host_slot
+from ..http_client import http_clients
+from ..ratelimit import rate_limiter
+from .errors import RetryLater, retry_after_header
+
+# Cloud API error codes that mean "slow down" rather than "this message is wrong".
+THROTTLING_CODES = {4, 80007, 130429, 131048, 131056}
+# 131056 is the per-recipient pair rate limit; the others throttle the whole phone number/app.
+PAIR_RATE_CODE = 131056
 
 
 def draft_whatsapp(message: str) -> str:
     return f"https://wa.me/?text={quote(message)}"
 
 
-async def post_whatsapp(message: str, cfg: dict) -> list[dict]:
-    provider = cfg.get("provider", "draft")
-    if provider == "draft":
-        return [{"status": "draft", "external_id": draft_whatsapp(message)}]
-
-    token = cfg.get("token")
-    phone_number_id = cfg.get("phone_number_id")
-    numbers = cfg.get("to_numbers", [])
-    if not token or not phone_number_id or not numbers:
-        return [{"status": "failed", "external_id": "whatsapp_cloud_not_configured"}]
-
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    url = f"https://graph.facebook.com/v20.0/{phone_number_id}/messages"
-
-    results = []
-    async with httpx.AsyncClient(timeout=20) as client:
-        for number in numbers:
-            payload = {
-                "messaging_product": "whatsapp",
-                "to": number,
-                "type": "text",
-                "text": {"preview_url": False, "body": message},
-            }
-            resp = await client.post(url, headers=headers, json=payload)
-            if resp.status_code >= 400:
-                results.append({"status": "failed", "external_id": resp.text})
-            else:
-                results.append(
-                    {
-                        "status": "posted",
-                        "external_id": str(resp.json().get("messages", [{}])[0].get("id", "ok")),
-                    }
-                )
-    return results
\ No newline at end of file
+def whatsapp_recipients(cfg: dict) -> list[str] | None:
+    if cfg.get("provider", "draft") == "draft":
+        return None
+    if not cfg.get("token") or not cfg.get("phone_number_id") or not cfg.get("to_numbers"):
+        return None
+    return list(cfg["to_numbers"])
+
+
+def whatsapp_fallback(message: str, cfg: dict) -> dict:
+    if cfg.get("provider", "draft") == "draft":
+        return {"status": "draft", "external_id": draft_whatsapp(message)}
+    return {"status": "failed", "external_id": "whatsapp_cloud_not_configured"}
+
+
+async def send_whatsapp(message: str, number: str, cfg: dict) -> dict:
+    headers = {"Authorization": f"Bearer {cfg['token']}", "Content-Type": "application/json"}
+    url = f"https://graph.facebook.com/v20.0/{cfg['phone_number_id']}/messages"
+    payload = {
+        "messaging_product": "whatsapp",
+        "to": number,
+        "type": "text",
+        "text": {"preview_url": False, "body": message},
+    }
+    await rate_limiter.acquire("whatsapp", number)
+    async with host_slot(url):
+        resp = await http_clients.get(url).post(url, headers=headers, json=payload)
+    if resp.status_code >= 400:
+        try:
+            code = resp.json().get("error", {}).get("code")
+        except ValueError:
+            code = None
+        retry_after = retry_after_header(resp.headers.get("Retry-After"))
+        if resp.status_code == 429 or code in THROTTLING_CODES:
+            rate_limiter.penalize("whatsapp", number if code == PAIR_RATE_CODE else None, retry_after)
+            raise RetryLater(resp.text, retry_after)
+        if resp.status_code >= 500:
+            raise RetryLater(resp.text, retry_after)
+        return {"status": "failed", "external_id": resp.text}
+    return {"status": "posted", "external_id": str(resp.json().get("messages", [{}])[0].get("id", "ok"))}
+
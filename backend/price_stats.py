@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import json
+import logging
+from datetime import timedelta
+from statistics import median
+
+from .config import settings
+from .db import db_write
+from .models import PriceStats
+from .utils import json_dump, now_utc
+
+logger = logging.getLogger("smartdeals.price_stats")
+# price_daily is maintained by the price_history_rollup trigger on every deal_price_history insert,
+# so a 30-day window is at most 30 primary-key rows per product whatever the raw history holds.
+WINDOW_DAYS = 30
+
+
+def _since_day() -> str:
+    return (now_utc() - timedelta(days=WINDOW_DAYS - 1)).date().isoformat()
+
+
+def price_stats_30d(conn, keys: set[tuple[str, str]]) -> dict[tuple[str, str], PriceStats]:
+    if not keys:
+        return {}
+    rows = conn.execute(
+        """
+        SELECT p.deal_source, p.product_id, SUM(p.price_sum) / SUM(p.points) AS avg_price, MIN(p.min_price) AS min_price,
+               json_group_array(p.last_price) AS closes
+        FROM json_each(?) AS k
+        JOIN price_daily p
+          ON p.deal_source=json_extract(k.value, '$[0]') AND p.product_id=json_extract(k.value, '$[1]') AND p.day>=?
+        GROUP BY p.deal_source, p.product_id
+        """,
+        (json_dump(sorted(keys)), _since_day()),
+    ).fetchall()
+    stats = {}
+    for r in rows:
+        # The median is taken over daily closing prices: one vote per day, however often a day was sampled.
+        closes = json.loads(r["closes"])
+        stats[(r["deal_source"], r["product_id"])] = PriceStats(
+            avg_price=float(r["avg_price"]) if r["avg_price"] else None,
+            min_price=float(r["min_price"]) if r["min_price"] else None,
+            median_price=float(median(closes)) if closes else None,
+            days=len(closes),
+        )
+    return stats
+
+
+def prune_price_history(conn, retention_days: int, chunk_size: int = 5000) -> int:
+    cutoff = (now_utc() - timedelta(days=retention_days)).isoformat()
+    return conn.execute(
+        "DELETE FROM deal_price_history WHERE id IN (SELECT id FROM deal_price_history WHERE captured_at<? LIMIT ?)",
+        (cutoff, chunk_size),
+    ).rowcount
+
+
+async def prune_history(chunk_size: int = 5000) -> int:
+    # Raw points are rolled up as they are inserted, so anything past retention only costs space.
+    # One chunk per write transaction keeps the writer free for scans in between.
+    total = 0
+    while True:
+        deleted = await db_write(prune_price_history, settings.price_history_retention_days, chunk_size)
+        total += deleted
+        if deleted < chunk_size:
+            if total:
+                logger.info("Pruned %s price points older than %s days", total, settings.price_history_retention_days)
+            return total
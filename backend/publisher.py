@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import logging
+
+from .app_config import get_config
+from .db import db_write
+from .formatter import format_post_message
+from .ledger import autopost_candidates
+from .outbox import enqueue, outbox_worker
+from .poster.telegram import post_to_telegram
+from .poster.whatsapp import send_whatsapp, whatsapp_fallback, whatsapp_recipients
+from .utils import json_dump, json_load, now_utc
+
+
+logger = logging.getLogger("smartdeals.publisher")
+
+
+def _enqueue_publications(conn, jobs: list[tuple[int, str, str, str]], local_rows: list[tuple], deal_ids: list[int]) -> list[str]:
+    queued = enqueue(conn, jobs)
+    # Channels that need no network call (draft links, unconfigured Telegram) are logged right away.
+    conn.executemany("INSERT INTO posts(deal_id,channel,status,external_id,payload,created_at) VALUES (?,?,?,?,?,?)", local_rows)
+    # Setting posted_at feeds the ledger trigger, so only a new message counts as a post. Repeats
+    # (already queued, a retried failure, another draft link) must not spend daily_post_limit or
+    # restart the cooldown; a deal with only local rows counts the first time it is published.
+    new_posts = {job[0] for job, outcome in zip(jobs, queued) if outcome == "queued"}
+    posted_at = now_utc().isoformat()
+    conn.executemany(
+        "UPDATE deals SET posted_at=?, status='posted', updated_at=? WHERE id=? AND (? OR posted_at IS NULL)",
+        [(posted_at, posted_at, deal_id, deal_id in new_posts) for deal_id in deal_ids],
+    )
+    return queued
+
+
+def _build_publications(
+    deals: list[dict], cfg: dict
+) -> tuple[list[tuple[int, str, str, str]], list[tuple], list[dict], list[tuple[dict, str | int]]]:
+    telegram_cfg = cfg.get("telegram", {})
+    whatsapp_cfg = cfg.get("whatsapp", {})
+    numbers = whatsapp_recipients(whatsapp_cfg)
+    telegram_ready = bool(telegram_cfg.get("bot_token") and telegram_cfg.get("chat_id"))
+
+    jobs: list[tuple[int, str, str, str]] = []
+    local_rows: list[tuple] = []
+    results: list[dict] = []
+    # Where each job's status lives in results, filled in once the enqueue says whether it was new.
+    slots: list[tuple[dict, str | int]] = []
+    created = now_utc().isoformat()
+    for deal in deals:
+        payload = dict(deal)
+        payload["reasons"] = json_load(payload.get("reasons"), [])
+        message = format_post_message(payload)
+        result = {"telegram": "queued", "whatsapp": []}
+        if telegram_ready:
+            jobs.append((deal["id"], "telegram", "", message))
+            slots.append((result, "telegram"))
+        else:
+            result["telegram"] = "skipped"
+            local_rows.append((deal["id"], "telegram", "skipped", "telegram_not_configured", json_dump({"message": message}), created))
+        if numbers is None:
+            fallback = whatsapp_fallback(message, whatsapp_cfg)
+            result["whatsapp"].append(fallback)
+            local_rows.append((deal["id"], "whatsapp", fallback["status"], fallback["external_id"], json_dump({"message": message}), created))
+        else:
+            for number in numbers:
+                jobs.append((deal["id"], "whatsapp", number, message))
+                slots.append((result, len(result["whatsapp"])))
+                result["whatsapp"].append({"status": "queued", "to": number})
+        results.append(result)
+    return jobs, local_rows, results, slots
+
+
+def _publish(conn, deals: list[dict], cfg: dict) -> list[dict]:
+    jobs, local_rows, results, slots = _build_publications(deals, cfg)
+    queued = _enqueue_publications(conn, jobs, local_rows, [deal["id"] for deal in deals])
+    for (result, slot), outcome in zip(slots, queued):
+        if slot == "telegram":
+            result["telegram"] = outcome
+        else:
+            result["whatsapp"][slot]["status"] = outcome
+    skipped = queued.count("already_queued")
+    if skipped:
+        logger.info("Skipped %s publications already in the outbox", skipped)
+    return results
+
+
+def _autopublish(conn, cfg: dict) -> list[dict]:
+    # Pick and enqueue in one write transaction, so an approve or force-post landing in between
+    # cannot push the day past daily_post_limit.
+    return _publish(conn, autopost_candidates(conn, cfg), cfg)
+
+
+async def publish_deals(deals: list[dict], cfg: dict) -> list[dict]:
+    if not deals:
+        return []
+    results = await db_write(_publish, deals, cfg)
+    outbox_worker.notify()
+    return results
+
+
+async def autopublish(cfg: dict) -> list[dict]:
+    results = await db_write(_autopublish, cfg)
+    if results:
+        outbox_worker.notify()
+    return results
+
+
+async def send_job(job: dict) -> tuple[str, str]:
+    # Credentials are read at send time so they are never persisted in the outbox.
+    cfg = get_config()
+    if job["channel"] == "telegram":
+        return await post_to_telegram(job["message"], cfg.get("telegram", {}))
+    result = await send_whatsapp(job["message"], job["recipient"], cfg.get("whatsapp", {}))
+    return result["status"], result["external_id"]
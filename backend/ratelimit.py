@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+
+from .app_config import config_version, get_config
+
+
+logger = logging.getLogger("smartdeals.ratelimit")
+MAX_DESTINATION_BUCKETS = 10_000
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def configure(self, rate: float, burst: float) -> None:
+        self._refill(time.monotonic())
+        self.rate, self.burst = rate, burst
+        self.tokens = min(self.tokens, burst)
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        # Take a token now, even if that leaves the bucket in debt, and return how long the caller must wait.
+        # Reserving synchronously keeps callers in FIFO order without a loop-bound lock.
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        debt_wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(debt_wait, self.blocked_until - now)
+
+    def block(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.burst and self.blocked_until <= self.updated
+
+
+class RateLimiter:
+    def __init__(self) -> None:
+        self._buckets: dict[str, TokenBucket] = {}
+        self._limits: dict[str, tuple[float, float]] = {}
+        self._version: int | None = None
+        self._counters: dict[str, dict[str, float]] = defaultdict(
+            lambda: {"acquired": 0, "throttled": 0, "waited_seconds": 0.0, "penalties": 0}
+        )
+
+    def _sync_limits(self) -> None:
+        version = config_version()
+        if version == self._version:
+            return
+        limits = get_config().get("rate_limits") or {}
+        self._limits = {name: (float(v["rate"]), float(v["burst"])) for name, v in limits.items() if isinstance(v, dict)}
+        self._version = version
+        for key, bucket in self._buckets.items():
+            bucket.configure(*self._limit_for(key))
+
+    def _limit_for(self, key: str) -> tuple[float, float]:
+        # "telegram" uses the provider limit, "telegram:<chat_id>" the per-destination one ("telegram_destination").
+        provider, _, destination = key.partition(":")
+        name = f"{provider}_destination" if destination else provider
+        return self._limits.get(name, (1.0, 1.0))
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_DESTINATION_BUCKETS:
+                self._buckets = {k: b for k, b in self._buckets.items() if not b.full()}
+            bucket = self._buckets[key] = TokenBucket(*self._limit_for(key))
+        return bucket
+
+    async def _wait(self, bucket: TokenBucket) -> float:
+        waited = 0.0
+        delay = bucket.reserve()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            waited += delay
+            # A Retry-After that arrived while we slept pushes this request back too.
+            delay = bucket.blocked_until - time.monotonic()
+        return waited
+
+    async def acquire(self, provider: str, destination: str | None = None) -> float:
+        self._sync_limits()
+        waited = 0.0
+        # Destination first, provider second: taking the shared token only once this request can actually go
+        # stops requests held back by a slow destination from bunching up against the provider limit later.
+        if destination:
+            waited += await self._wait(self._bucket(f"{provider}:{destination}"))
+        waited += await self._wait(self._bucket(provider))
+        counters = self._counters[provider]
+        counters["acquired"] += 1
+        if waited:
+            counters["throttled"] += 1
+            counters["waited_seconds"] += waited
+        return waited
+
+    def penalize(self, provider: str, destination: str | None, retry_after: float | None) -> None:
+        seconds = retry_after if retry_after is not None else 1.0
+        self._bucket(f"{provider}:{destination}" if destination else provider).block(seconds)
+        self._counters[provider]["penalties"] += 1
+        logger.info("%s throttled%s, pausing %.1fs", provider, f" for {destination}" if destination else "", seconds)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        return {
+            provider: {**counters, "waited_seconds": round(counters["waited_seconds"], 3)}
+            for provider, counters in self._counters.items()
+        }
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import logging
+import time
+from datetime import timedelta
+
+from .app_config import get_config
+from .db import db_read, db_write
+from .ingest import upsert_known_deals
+from .models import DealInput
+from .sources.mercadolivre import auth_headers, fetch_items
+from .utils import json_dump, now_utc
+
+
+logger = logging.getLogger("smartdeals.refresh")
+_running = False
+
+
+def due_items(conn, cfg: dict) -> list[dict]:
+    tracking = cfg.get("price_tracking") or {}
+    now = now_utc()
+    posted_since = (now - timedelta(days=float(tracking.get("refresh_posted_days", 7)))).isoformat()
+    statuses = [s for s in tracking.get("refresh_statuses", ["pending_approval", "approved"]) if s != "posted"]
+    # Two index range reads on idx_deals_publish rather than one OR that would scan deals.
+    rows = conn.execute(
+        """
+        SELECT d.id, d.source, d.product_id, d.title, d.url, d.current_price, d.old_price, r.interval_minutes
+        FROM (
+            SELECT id FROM deals WHERE status IN (SELECT value FROM json_each(?))
+            UNION ALL
+            SELECT id FROM deals WHERE status='posted' AND posted_at>=?
+        ) AS t
+        JOIN deals d ON d.id=t.id
+        LEFT JOIN item_refresh r ON r.deal_id=d.id
+        WHERE d.source='mercadolivre' AND (r.next_refresh_at IS NULL OR r.next_refresh_at<=?)
+        ORDER BY r.next_refresh_at IS NOT NULL, r.next_refresh_at
+        LIMIT ?
+        """,
+        (json_dump(statuses), posted_since, now.isoformat(), int(tracking.get("refresh_max_items", 2000))),
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def next_interval(current: float | None, changed: bool, tracking: dict) -> float:
+    # Halve the interval when the price moved, stretch it by half when it did not: items settle
+    # near how often their price actually changes, between refresh_min_minutes and refresh_max_minutes.
+    low = float(tracking.get("refresh_min_minutes", 15))
+    high = float(tracking.get("refresh_max_minutes", 1440))
+    if current is None:
+        return low
+    return max(low, min(high, current * (0.5 if changed else 1.5)))
+
+
+def apply_refresh(conn, items: list[dict], found: dict[str, dict], cfg: dict) -> dict:
+    tracking = cfg.get("price_tracking") or {}
+    now = now_utc()
+    checked = now.isoformat()
+    incoming: list[DealInput] = []
+    schedule: list[tuple] = []
+    inactive = 0
+    for item in items:
+        body = found.get(item["product_id"])
+        interval = item["interval_minutes"]
+        if body is None:
+            # The batch request failed: try again after the current interval, without learning from it.
+            interval = interval or float(tracking.get("refresh_min_minutes", 15))
+            schedule.append((item["id"], interval, (now + timedelta(minutes=interval)).isoformat(), 0, 0, checked))
+            continue
+        price = body.get("price")
+        if body.get("status") != "active" or not price:
+            inactive += 1
+            interval = float(tracking.get("refresh_max_minutes", 1440))
+            schedule.append((item["id"], interval, (now + timedelta(minutes=interval)).isoformat(), 1, 0, checked))
+            continue
+        changed = float(price) != float(item["current_price"] or 0)
+        interval = next_interval(interval, changed, tracking)
+        schedule.append((item["id"], interval, (now + timedelta(minutes=interval)).isoformat(), 1, int(changed), checked))
+        incoming.append(
+            DealInput(
+                source=item["source"],
+                product_id=item["product_id"],
+                title=item["title"],
+                url=item["url"],
+                current_price=float(price),
+                old_price=body.get("original_price") or item["old_price"],
+            )
+        )
+
+    # Same path as a scan that sees a known listing: history point, price update and bulk rescore.
+    _, stats = upsert_known_deals(conn, incoming, cfg)
+    conn.executemany(
+        """
+        INSERT INTO item_refresh(deal_id, interval_minutes, next_refresh_at, checks, changes, last_checked_at)
+        VALUES (?,?,?,?,?,?)
+        ON CONFLICT(deal_id) DO UPDATE SET
+            interval_minutes=excluded.interval_minutes, next_refresh_at=excluded.next_refresh_at,
+            checks=checks + excluded.checks, changes=changes + excluded.changes, last_checked_at=excluded.last_checked_at
+        """,
+        schedule,
+    )
+    return {"checked": len(items), "refreshed": len(incoming), "inactive": inactive, **stats}
+
+
+async def refresh_tracked() -> dict:
+    global _running
+    if _running:
+        return {"skipped": True}
+    _running = True
+    try:
+        cfg = get_config()
+        items = await db_read(due_items, cfg)
+        if not items:
+            return {"checked": 0}
+        started = time.perf_counter()
+        found = await fetch_items([item["product_id"] for item in items], auth_headers(cfg))
+        stats = await db_write(apply_refresh, items, found, cfg)
+        logger.info("Refreshed %s tracked items in %.1fs: %s", len(items), time.perf_counter() - started, stats)
+        return stats
+    finally:
+        _running = False
+
+
+def refresh_summary(conn) -> dict:
+    row = conn.execute(
+        "SELECT COUNT(*) AS tracked, COALESCE(SUM(next_refresh_at<=?), 0) AS due, "
+        "AVG(interval_minutes) AS avg_interval_minutes, COALESCE(SUM(checks), 0) AS checks, COALESCE(SUM(changes), 0) AS changes "
+        "FROM item_refresh",
+        (now_utc().isoformat(),),
+    ).fetchone()
+    summary = dict(row)
+    if summary["avg_interval_minutes"] is not None:
+        summary["avg_interval_minutes"] = round(summary["avg_interval_minutes"], 1)
+    return summary
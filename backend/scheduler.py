@@ -1,14 +1,90 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
+from .collector import SOURCES
 from .config import settings
+from .db import db_write
+from .price_stats import prune_history
+from .refresh import refresh_tracked
+from .utils import json_dump, now_utc
 
+logger = logging.getLogger("smartdeals.scheduler")
 scheduler = AsyncIOScheduler()
+ScanFunc = Callable[[tuple[str, ...] | None], Awaitable[dict]]
+
+
+def _record_skipped(conn, sources: tuple[str, ...] | None, reason: str) -> None:
+    now = now_utc().isoformat()
+    conn.execute(
+        "INSERT INTO scan_runs(started_at,finished_at,status,message,stats) VALUES (?,?,?,?,?)",
+        (now, now, "skipped", "scan anterior ainda em andamento", json_dump({"sources": list(sources or SOURCES), "trigger": reason})),
+    )
+
+
+class SingleFlightScan:
+    def __init__(self) -> None:
+        self._scan: ScanFunc | None = None
+        self._task: asyncio.Task | None = None
+        self._sources: tuple[str, ...] | None = None
+
+    def bind(self, scan: ScanFunc) -> None:
+        self._scan = scan
+
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def trigger(self, sources: tuple[str, ...] | None = None, reason: str = "manual") -> dict:
+        # No await between the check and create_task, so two triggers can never both start a scan.
+        if self.running():
+            if reason == "manual":
+                logger.info("Manual scan attached to the in-flight run (%s)", ", ".join(self._sources or SOURCES))
+                return {**await asyncio.shield(self._task), "attached": True}
+            logger.info("Skipping %s scan of %s: previous scan still running", reason, ", ".join(sources or SOURCES))
+            await db_write(_record_skipped, sources, reason)
+            return {"skipped": True}
+        self._sources = sources
+        self._task = asyncio.create_task(self._scan(sources))
+        # Shielded so a caller going away (client disconnect) does not cancel the scan itself.
+        return await asyncio.shield(self._task)
+
+
+scan_runner = SingleFlightScan()
+
+
+def source_interval_minutes(source: str) -> float:
+    return float(settings.source_intervals_minutes.get(source, settings.scheduler_interval_minutes))
 
 
-def start_scheduler(scan_func):
+def start_scheduler(scan_func: ScanFunc):
+    scan_runner.bind(scan_func)
     if scheduler.running:
         return
-    scheduler.add_job(scan_func, "interval", minutes=settings.scheduler_interval_minutes, id="periodic_scan")
-    scheduler.start()
\ No newline at end of file
+    for source in SOURCES:
+        scheduler.add_job(
+            scan_runner.trigger,
+            "interval",
+            minutes=source_interval_minutes(source),
+            jitter=settings.scheduler_jitter_seconds,
+            args=[(source,), "scheduled"],
+            id=f"scan_{source}",
+            # 2, not 1: an overlapping fire must reach trigger() so the skip is recorded in scan_runs.
+            max_instances=2,
+            coalesce=True,
+            misfire_grace_time=settings.scheduler_misfire_grace_seconds,
+        )
+    scheduler.add_job(
+        refresh_tracked,
+        "interval",
+        minutes=settings.refresh_interval_minutes,
+        id="refresh_tracked",
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=settings.scheduler_misfire_grace_seconds,
+    )
+    scheduler.add_job(prune_history, "interval", hours=24, id="prune_price_history", max_instances=1, coalesce=True)
+    scheduler.start()
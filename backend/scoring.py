@@ -1,20 +1,109 @@
 from __future__ import annotations
 
+import re
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass
 from datetime import timedelta
+from functools import lru_cache
 
-from .models import ScoreResult
+from .models import PriceStats, ScoreResult
 from .utils import now_utc
 
+HIGH_REPUTATION_MARKERS = ("green", "5", "high")
+LOW_REPUTATION_MARKERS = ("low", "red")
 
-def score_deal(deal: dict, config: dict, avg_price_30d: float | None) -> ScoreResult:
+
+@dataclass(frozen=True)
+class ScoringRules:
+    discount_rule: float
+    blocked_pattern: re.Pattern | None
+    blocks_everything: bool = False
+
+    def is_blocked(self, title: str) -> bool:
+        if self.blocks_everything:
+            return True
+        return self.blocked_pattern is not None and self.blocked_pattern.search(title) is not None
+
+
+def _trie_regex(words: set[str]) -> str:
+    # Factor shared prefixes so the regex engine tries each branch once per position,
+    # instead of walking every blocked word in turn. Only "is any word present" matters,
+    # so a branch can stop at the first complete word.
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        if "" in node:
+            return ""
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return emit(trie)
+
+
+def compile_rules(config: dict) -> ScoringRules:
+    words = {w.lower() for w in config.get("blocked_words", [])}
+    return ScoringRules(
+        discount_rule=float(config.get("min_discount_percent", 20)),
+        blocked_pattern=re.compile(_trie_regex(words - {""})) if words - {""} else None,
+        blocks_everything="" in words,
+    )
+
+
+_rules_cache: tuple[dict, ScoringRules] | None = None
+
+
+def rules_for(config: dict) -> ScoringRules:
+    # get_config() hands out one read-only dict per config version, so identity is the version key.
+    global _rules_cache
+    cached = _rules_cache
+    if cached is not None and cached[0] is config:
+        return cached[1]
+    rules = compile_rules(config)
+    _rules_cache = (config, rules)
+    return rules
+
+
+@lru_cache(maxsize=4096)
+def reputation_class(seller_rep: str) -> tuple[bool, bool]:
+    return (
+        any(k in seller_rep for k in HIGH_REPUTATION_MARKERS),
+        any(k in seller_rep for k in LOW_REPUTATION_MARKERS),
+    )
+
+
+def is_lowest_30d(current: float, stats: PriceStats | None) -> bool:
+    # At or under the 30-day low, and that low is a real dip below the typical (median) price,
+    # so a listing that has sat at one price all month does not count.
+    return bool(
+        stats is not None
+        and stats.min_price
+        and stats.median_price
+        and current > 0
+        and current <= stats.min_price < stats.median_price
+    )
+
+
+def score_deal(
+    deal: dict,
+    config: dict,
+    avg_price_30d: float | None,
+    rules: ScoringRules | None = None,
+    price_stats: PriceStats | None = None,
+) -> ScoreResult:
+    rules = rules or rules_for(config)
     reasons: list[str] = []
     score = 50
 
-    blocked_words = [w.lower() for w in config.get("blocked_words", [])]
-    discount_rule = float(config.get("min_discount_percent", 20))
+    discount_rule = rules.discount_rule
     title = (deal.get("title") or "").lower()
     condition = (deal.get("condition") or "new").lower()
-    seller_rep = (deal.get("seller_reputation") or "").lower()
+    high_rep, low_rep = reputation_class((deal.get("seller_reputation") or "").lower())
 
     current = float(deal.get("current_price") or 0)
     old = float(deal.get("old_price") or 0) if deal.get("old_price") else 0
@@ -23,7 +112,7 @@ def score_deal(deal: dict, config: dict, avg_price_30d: float | None) -> ScoreRe
     if deal.get("is_official_store"):
         score += 30
         reasons.append("Loja oficial")
-    if any(k in seller_rep for k in ["green", "5", "high"]):
+    if high_rep:
         score += 20
         reasons.append("Reputação alta")
     if (deal.get("sold_quantity") or 0) >= 100:
@@ -36,16 +125,16 @@ def score_deal(deal: dict, config: dict, avg_price_30d: float | None) -> ScoreRe
         score += 10
         reasons.append("Frete grátis")
 
-    if any(word in title for word in blocked_words):
+    if rules.is_blocked(title):
         score -= 50
         reasons.append("Contém palavra bloqueada")
     if condition != "new":
         score -= 40
         reasons.append("Produto não é novo")
-    if any(k in seller_rep for k in ["low", "red"]):
+    if low_rep:
         score -= 30
         reasons.append("Reputação baixa")
-    if current > 0 and old > 0 and current <= old * 0.4 and any(k in seller_rep for k in ["low", "red"]):
+    if current > 0 and old > 0 and current <= old * 0.4 and low_rep:
         score -= 20
         reasons.append("Variação suspeita")
 
@@ -56,6 +145,9 @@ def score_deal(deal: dict, config: dict, avg_price_30d: float | None) -> ScoreRe
             below_avg_bonus = 15
             score += 15
             reasons.append("Preço muito abaixo da média de 30 dias")
+    if is_lowest_30d(current, price_stats):
+        score += 10
+        reasons.append("Menor preço em 30 dias")
 
     score = max(0, min(100, score))
     verdict = "Vale a pena" if score >= 70 else "Avaliar com cautela"
@@ -66,4 +158,75 @@ def score_deal(deal: dict, config: dict, avg_price_30d: float | None) -> ScoreRe
         discount_percent=discount_percent,
         below_avg_bonus=below_avg_bonus,
         scored_at=now_utc() + timedelta(0),
-    )
\ No newline at end of file
+    )
+
+
+def score_deals_batch(
+    deals: Sequence[dict],
+    config: dict,
+    avg_prices_30d: Sequence[float | None],
+    rules: ScoringRules | None = None,
+    price_stats: Sequence[PriceStats | None] | None = None,
+) -> list[ScoreResult]:
+    # Column-wise version of score_deal: each rule is evaluated over the whole batch,
+    # then reasons are assembled per deal in the same order score_deal uses.
+    rules = rules or rules_for(config)
+    discount_rule = rules.discount_rule
+    discount_reason = f"Desconto >= {discount_rule:.0f}%"
+
+    current = array("d", (float(d.get("current_price") or 0) for d in deals))
+    old = array("d", (float(d.get("old_price") or 0) if d.get("old_price") else 0 for d in deals))
+    avg = array("d", (a or 0.0 for a in avg_prices_30d))
+    discount = array(
+        "d", (round(((o - c) / o) * 100, 2) if o > 0 and c > 0 else 0.0 for c, o in zip(current, old))
+    )
+    reputation = [reputation_class((d.get("seller_reputation") or "").lower()) for d in deals]
+
+    official = [bool(d.get("is_official_store")) for d in deals]
+    high_rep = [high for high, _ in reputation]
+    sold = [(d.get("sold_quantity") or 0) >= 100 for d in deals]
+    discounted = [p >= discount_rule for p in discount]
+    free_shipping = [bool(d.get("shipping_free")) for d in deals]
+    blocked = [rules.is_blocked((d.get("title") or "").lower()) for d in deals]
+    not_new = [(d.get("condition") or "new").lower() != "new" for d in deals]
+    low_rep = [low for _, low in reputation]
+    suspicious = [c > 0 and o > 0 and c <= o * 0.4 and low for c, o, low in zip(current, old, low_rep)]
+    below_avg = [a > 0 and c > 0 and ((a - c) / a) * 100 >= 15 for a, c in zip(avg, current)]
+    lowest = [is_lowest_30d(c, st) for c, st in zip(current, price_stats or [None] * len(deals))]
+
+    columns = (
+        (official, 30, "Loja oficial"),
+        (high_rep, 20, "Reputação alta"),
+        (sold, 10, "Alta quantidade vendida"),
+        (discounted, 20, discount_reason),
+        (free_shipping, 10, "Frete grátis"),
+        (blocked, -50, "Contém palavra bloqueada"),
+        (not_new, -40, "Produto não é novo"),
+        (low_rep, -30, "Reputação baixa"),
+        (suspicious, -20, "Variação suspeita"),
+        (below_avg, 15, "Preço muito abaixo da média de 30 dias"),
+        (lowest, 10, "Menor preço em 30 dias"),
+    )
+    scores = array("l", [50] * len(deals))
+    reasons: list[list[str]] = [[] for _ in deals]
+    for flags, points, reason in columns:
+        for i, flag in enumerate(flags):
+            if flag:
+                scores[i] += points
+                reasons[i].append(reason)
+
+    scored_at = now_utc() + timedelta(0)
+    results = []
+    for i in range(len(deals)):
+        score = max(0, min(100, scores[i]))
+        results.append(
+            ScoreResult(
+                score=score,
+                reasons=reasons[i],
+                verdict="Vale a pena" if score >= 70 else "Avaliar com cautela",
+                discount_percent=discount[i],
+                below_avg_bonus=15.0 if below_avg[i] else 0.0,
+                scored_at=scored_at,
+            )
+        )
+    return results
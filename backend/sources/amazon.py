@@ -1,55 +1,241 @@
 from __future__ import annotations
 
+import asyncio
+import codecs
+import json
+import logging
 import re
+import time
+from html.parser import HTMLParser
 from typing import Any
 
 import httpx
 
-from ..config import settings
+from ..concurrency import host_slot
+from ..db import db_read, db_write
+from ..http_cache import CacheEntry, cache_key, conditional_headers, is_offline, lookup, record_failure, revalidated, store, touch
+from ..http_client import http_clients
 from ..models import DealInput
+from ..utils import normalize_price
+from .amazon_paapi import fetch_items, marketplace_for, paapi_enabled
 
 
+logger = logging.getLogger("smartdeals.sources.amazon")
 ASIN_RE = re.compile(r"(?:dp|gp/product)/([A-Z0-9]{10})")
+BARE_ASIN_RE = re.compile(r"[A-Z0-9]{10}")
+PRICE_RE = re.compile(r"\d[\d.]*(?:,\d{1,2})?")
+PRICE_CONTAINERS = {"corePrice_feature_div", "corePriceDisplay_desktop_feature_div", "corePrice_desktop", "apex_desktop"}
+UNAVAILABLE_MARKERS = ("indisponível", "não disponível", "currently unavailable", "unavailable")
+WHITESPACE_RE = re.compile(r"\s+")
 
 
-async def fetch_amazon_deals(config: dict[str, Any]) -> list[DealInput]:
-    amazon_cfg = config.get("amazon", {})
-    links: list[str] = amazon_cfg.get("manual_links", [])
-    if not links:
-        return []
-
-    deals: list[DealInput] = []
-    async with httpx.AsyncClient(timeout=settings.request_timeout_seconds, follow_redirects=True) as client:
-        for link in links[:20]:
-            asin_match = ASIN_RE.search(link)
-            asin = asin_match.group(1) if asin_match else link[-10:]
+class ProductPageParser(HTMLParser):
+    # Fed decoded chunks as they arrive; `done` flips once title, price and availability are all known.
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.fields: dict[str, str] = {}
+        self._capture: list | None = None
+        self._price_region: list | None = None
+        self._price_kind: str | None = None
+        self.unavailable = False
+
+    @property
+    def done(self) -> bool:
+        return "title" in self.fields and "price" in self.fields and ("availability" in self.fields or self.unavailable)
+
+    def _start_capture(self, field: str, tag: str) -> None:
+        if self._capture is None and field not in self.fields:
+            self._capture = [field, tag, 1, []]
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        attr = dict(attrs)
+        element_id = attr.get("id") or ""
+        classes = (attr.get("class") or "").split()
+        if self._capture is not None and tag == self._capture[1]:
+            self._capture[2] += 1
+        if self._price_region is not None and tag == self._price_region[0]:
+            self._price_region[1] += 1
+
+        if element_id == "productTitle":
+            self._start_capture("title", tag)
+        elif tag == "title" and "title" not in self.fields:
+            self._start_capture("page_title", tag)
+        elif element_id == "availability":
+            self._start_capture("availability", tag)
+        elif element_id == "outOfStock":
+            self.unavailable = True
+        elif element_id in PRICE_CONTAINERS and self._price_region is None:
+            self._price_region = [tag, 1]
+        elif self._price_region is not None and tag == "span":
+            if "a-price" in classes:
+                self._price_kind = "old_price" if "a-text-price" in classes else "price"
+            elif "a-offscreen" in classes and self._price_kind:
+                self._start_capture(self._price_kind, tag)
+                self._price_kind = None
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._price_region is not None and tag == self._price_region[0]:
+            self._price_region[1] -= 1
+            if self._price_region[1] == 0:
+                self._price_region = None
+        if self._capture is None or tag != self._capture[1]:
+            return
+        self._capture[2] -= 1
+        if self._capture[2] == 0:
+            field, _, _, parts = self._capture
+            self._capture = None
+            text = WHITESPACE_RE.sub(" ", "".join(parts)).strip()
+            if text:
+                self.fields.setdefault(field, text)
+
+    def handle_data(self, data: str) -> None:
+        if self._capture is not None:
+            self._capture[3].append(data)
+
+
+def parse_brl(text: str | None) -> float | None:
+    match = PRICE_RE.search(text or "")
+    return normalize_price(match.group(0)) if match else None
+
+
+def is_available(parser: ProductPageParser) -> bool | None:
+    if parser.unavailable:
+        return False
+    text = parser.fields.get("availability")
+    if text is None:
+        return None
+    return not any(marker in text.lower() for marker in UNAVAILABLE_MARKERS)
+
+
+async def probe_page(link: str, max_bytes: int, headers: dict | None = None) -> tuple[int, ProductPageParser, int, httpx.Headers]:
+    parser = ProductPageParser()
+    read = 0
+    client = http_clients.get(link)
+    request_headers = {"User-Agent": "SmartDealsBot/1.0", **(headers or {})}
+    async with client.stream("GET", link, headers=request_headers, follow_redirects=True) as resp:
+        if resp.status_code >= 300:
+            return resp.status_code, parser, 0, resp.headers
+        decoder = codecs.getincrementaldecoder(resp.charset_encoding or "utf-8")(errors="replace")
+        async for chunk in resp.aiter_bytes():
+            read += len(chunk)
+            parser.feed(decoder.decode(chunk))
+            # Leaving the stream block early closes the response, so the rest of the page is never downloaded.
+            if parser.done or read >= max_bytes:
+                break
+        return resp.status_code, parser, read, resp.headers
+
+
+def _cached_parser(entry: CacheEntry) -> ProductPageParser:
+    # The cache keeps the extracted fields rather than the page, so a hit or a 304 costs no parsing at all.
+    data = entry.json()
+    parser = ProductPageParser()
+    parser.fields = data["fields"]
+    parser.unavailable = data["unavailable"]
+    return parser
+
+
+async def _probe(link: str, max_bytes: int) -> DealInput | None:
+    asin_match = ASIN_RE.search(link)
+    asin = asin_match.group(1) if asin_match else link[-10:]
+    key = cache_key(link)
+    entry = await db_read(lookup, key)
+    cached = entry is not None and bool(entry.body)
+    parser = ProductPageParser()
+    read = 0
+    mode = "cache"
+    status_ok = True
+    if is_offline():
+        if not cached:
+            return None
+        parser = _cached_parser(entry)
+    elif entry is not None and entry.negative_until > time.time():
+        status_ok = False
+    elif cached and entry.fresh:
+        parser = _cached_parser(entry)
+        await db_write(touch, key)
+    else:
+        async with host_slot(link):
             try:
-                resp = await client.get(link, headers={"User-Agent": "SmartDealsBot/1.0"})
-                status_ok = resp.status_code < 400
-                title = "Amazon Item"
-                if status_ok:
-                    title_match = re.search(r"<title>(.*?)</title>", resp.text, re.I | re.S)
-                    if title_match:
-                        title = title_match.group(1).strip()
-                else:
-                    title = f"ASIN {asin}"
+                status, parser, read, headers = await probe_page(link, max_bytes, conditional_headers(entry))
             except Exception:
-                status_ok = False
-                title = f"ASIN {asin}"
-            deals.append(
-                DealInput(
-                    source="amazon",
-                    product_id=asin,
-                    title=title,
-                    url=link,
-                    current_price=0.0,
-                    old_price=None,
-                    seller_name="Amazon",
-                    seller_reputation="high",
-                    is_official_store=True,
-                    shipping_free=False,
-                    condition="new",
-                    metadata={"validated": status_ok, "mode": "light"},
-                )
-            )
-    return deals
\ No newline at end of file
+                status, headers = 0, httpx.Headers()
+        if status == 304 and cached:
+            parser = _cached_parser(entry)
+            mode = "revalidated"
+            await db_write(revalidated, key, "amazon")
+        elif 200 <= status < 300:
+            mode = "stream"
+            body = json.dumps({"fields": parser.fields, "unavailable": parser.unavailable}).encode("utf-8")
+            await db_write(store, key, "amazon", link, status, headers.get("ETag"), headers.get("Last-Modified"), body)
+        else:
+            status_ok = False
+            await db_write(record_failure, key, "amazon", link, status)
+    title = parser.fields.get("title") or parser.fields.get("page_title") or (f"ASIN {asin}" if not status_ok else "Amazon Item")
+    price = parse_brl(parser.fields.get("price"))
+    return DealInput(
+        source="amazon",
+        product_id=asin,
+        title=title,
+        url=link,
+        current_price=price or 0.0,
+        old_price=parse_brl(parser.fields.get("old_price")),
+        seller_name="Amazon",
+        seller_reputation="high",
+        is_official_store=True,
+        shipping_free=False,
+        condition="new",
+        metadata={
+            "validated": status_ok,
+            "mode": mode,
+            "available": is_available(parser),
+            "bytes_read": read,
+            "complete": parser.done,
+        },
+    )
+
+
+def _targets(entries: list[str], marketplace: str) -> tuple[dict[str, str], list[str]]:
+    # manual_links accepts product links or bare ASINs; links without an ASIN can only be scraped.
+    by_asin: dict[str, str] = {}
+    other: list[str] = []
+    for entry in entries:
+        entry = entry.strip()
+        match = ASIN_RE.search(entry)
+        if BARE_ASIN_RE.fullmatch(entry):
+            by_asin.setdefault(entry, f"https://{marketplace}/dp/{entry}")
+        elif match:
+            by_asin.setdefault(match.group(1), entry)
+        elif entry:
+            other.append(entry)
+    return by_asin, other
+
+
+async def fetch_amazon_deals(
+    config: dict[str, Any], sink: list[DealInput] | None = None, persist: bool = True
+) -> list[DealInput]:
+    amazon_cfg = config.get("amazon", {})
+    max_bytes = int(amazon_cfg.get("probe_max_bytes", 600_000))
+    deals: list[DealInput] = sink if sink is not None else []
+    by_asin, other = _targets(amazon_cfg.get("manual_links", []), marketplace_for(amazon_cfg.get("region", "BR"))[2])
+    if not by_asin and not other:
+        return deals
+
+    missing = list(by_asin)
+    if paapi_enabled(amazon_cfg) and not is_offline():
+        missing = await fetch_items(missing, amazon_cfg, deals)
+    scrape = [by_asin[asin] for asin in missing] + other
+    limit = int(amazon_cfg.get("scrape_limit", 20))
+    if len(scrape) > limit:
+        logger.info("Scraping %s of %s Amazon links", limit, len(scrape))
+
+    async def run(link: str) -> None:
+        deal = await _probe(link, max_bytes)
+        if deal is None:
+            return
+        if deal.metadata["available"] is False:
+            logger.info("Skipping unavailable Amazon item %s", deal.product_id)
+            return
+        deals.append(deal)
+
+    await asyncio.gather(*(run(link) for link in scrape[:limit]))
+    return deals
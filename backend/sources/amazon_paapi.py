@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any
+from urllib.parse import urlsplit
+
+from ..concurrency import host_slot
+from ..http_client import http_clients
+from ..models import DealInput
+from ..poster.errors import retry_after_header
+from ..ratelimit import rate_limiter
+
+
+logger = logging.getLogger("smartdeals.sources.amazon_paapi")
+# region -> (API host, AWS signing region, marketplace)
+MARKETPLACES = {
+    "BR": ("webservices.amazon.com.br", "us-east-1", "www.amazon.com.br"),
+    "US": ("webservices.amazon.com", "us-east-1", "www.amazon.com"),
+    "MX": ("webservices.amazon.com.mx", "us-east-1", "www.amazon.com.mx"),
+    "CA": ("webservices.amazon.ca", "us-east-1", "www.amazon.ca"),
+    "UK": ("webservices.amazon.co.uk", "eu-west-1", "www.amazon.co.uk"),
+    "ES": ("webservices.amazon.es", "eu-west-1", "www.amazon.es"),
+    "DE": ("webservices.amazon.de", "eu-west-1", "www.amazon.de"),
+}
+SERVICE = "ProductAdvertisingAPI"
+GET_ITEMS_PATH = "/paapi5/getitems"
+GET_ITEMS_TARGET = "com.amazon.paapi5.v1.ProductAdvertisingAPIv1.GetItems"
+MAX_ITEMS_PER_REQUEST = 10
+# Only what DealInput and the scorer read; every extra resource makes the response larger.
+RESOURCES = [
+    "ItemInfo.Title",
+    "ItemInfo.ByLineInfo",
+    "Images.Primary.Medium",
+    "Offers.Listings.Price",
+    "Offers.Listings.SavingBasis",
+    "Offers.Listings.Availability.Type",
+    "Offers.Listings.Condition",
+    "Offers.Listings.MerchantInfo",
+    "Offers.Listings.DeliveryInfo.IsFreeShippingEligible",
+    "Offers.Listings.DeliveryInfo.IsAmazonFulfilled",
+]
+
+
+def marketplace_for(region: str) -> tuple[str, str, str]:
+    return MARKETPLACES.get((region or "BR").upper(), MARKETPLACES["BR"])
+
+
+def paapi_enabled(amazon_cfg: dict[str, Any]) -> bool:
+    return bool(amazon_cfg.get("pa_api_access_key") and amazon_cfg.get("pa_api_secret") and amazon_cfg.get("partner_tag"))
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+@lru_cache(maxsize=16)
+def _signing_key(secret: str, date: str, region: str) -> bytes:
+    return _hmac(_hmac(_hmac(_hmac(f"AWS4{secret}".encode("utf-8"), date), region), SERVICE), "aws4_request")
+
+
+def sign_request(
+    access_key: str, secret: str, region: str, host: str, path: str, target: str, payload: bytes, when: datetime | None = None
+) -> dict[str, str]:
+    when = when or datetime.now(timezone.utc)
+    amz_date = when.strftime("%Y%m%dT%H%M%SZ")
+    date = amz_date[:8]
+    headers = {
+        "content-encoding": "amz-1.0",
+        "content-type": "application/json; charset=utf-8",
+        "host": host,
+        "x-amz-date": amz_date,
+        "x-amz-target": target,
+    }
+    signed_headers = ";".join(sorted(headers))
+    canonical_request = "\n".join(
+        [
+            "POST",
+            path,
+            "",
+            "".join(f"{name}:{headers[name]}\n" for name in sorted(headers)),
+            signed_headers,
+            hashlib.sha256(payload).hexdigest(),
+        ]
+    )
+    scope = f"{date}/{region}/{SERVICE}/aws4_request"
+    string_to_sign = "\n".join(
+        ["AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()]
+    )
+    signature = hmac.new(_signing_key(secret, date, region), string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+    headers["Authorization"] = f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, SignedHeaders={signed_headers}, Signature={signature}"
+    return headers
+
+
+def _amount(value: dict | None) -> float | None:
+    amount = (value or {}).get("Amount")
+    return float(amount) if amount is not None else None
+
+
+def _to_deal(item: dict[str, Any], marketplace: str) -> DealInput | None:
+    asin = item.get("ASIN") or ""
+    listing = (((item.get("Offers") or {}).get("Listings")) or [{}])[0]
+    price = _amount(listing.get("Price"))
+    if price is None:
+        # No offer at all: the item cannot be bought right now.
+        return None
+    saving_basis = _amount(listing.get("SavingBasis"))
+    info = item.get("ItemInfo") or {}
+    merchant = (listing.get("MerchantInfo") or {}).get("Name") or ""
+    delivery = listing.get("DeliveryInfo") or {}
+    sold_by_amazon = merchant.lower().startswith("amazon")
+    availability = (listing.get("Availability") or {}).get("Type")
+    return DealInput(
+        source="amazon",
+        product_id=asin,
+        title=((info.get("Title") or {}).get("DisplayValue")) or f"ASIN {asin}",
+        url=item.get("DetailPageURL") or f"https://{marketplace}/dp/{asin}",
+        current_price=price,
+        old_price=saving_basis if saving_basis and saving_basis > price else None,
+        currency=(listing.get("Price") or {}).get("Currency") or "BRL",
+        seller_name=merchant or "Amazon",
+        seller_reputation="high" if sold_by_amazon or delivery.get("IsAmazonFulfilled") else None,
+        is_official_store=sold_by_amazon,
+        shipping_free=bool(delivery.get("IsFreeShippingEligible")),
+        condition=((listing.get("Condition") or {}).get("Value") or "new").lower(),
+        image_url=(((item.get("Images") or {}).get("Primary") or {}).get("Medium") or {}).get("URL"),
+        brand=(((info.get("ByLineInfo") or {}).get("Brand")) or {}).get("DisplayValue"),
+        metadata={"validated": True, "mode": "paapi", "available": True, "availability": availability},
+    )
+
+
+async def _get_items(asins: list[str], amazon_cfg: dict[str, Any]) -> dict | None:
+    host, signing_region, marketplace = marketplace_for(amazon_cfg.get("region", "BR"))
+    endpoint = (amazon_cfg.get("pa_api_endpoint") or f"https://{host}").rstrip("/")
+    url = endpoint + GET_ITEMS_PATH
+    payload = json.dumps(
+        {
+            "ItemIds": asins,
+            "ItemIdType": "ASIN",
+            "Resources": RESOURCES,
+            "PartnerTag": amazon_cfg["partner_tag"],
+            "PartnerType": "Associates",
+            "Marketplace": marketplace,
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+    for attempt in range(2):
+        await rate_limiter.acquire("amazon_paapi")
+        headers = sign_request(
+            amazon_cfg["pa_api_access_key"],
+            amazon_cfg["pa_api_secret"],
+            signing_region,
+            urlsplit(endpoint).netloc,
+            GET_ITEMS_PATH,
+            GET_ITEMS_TARGET,
+            payload,
+        )
+        async with host_slot(url):
+            try:
+                resp = await http_clients.get(url).post(url, content=payload, headers=headers)
+            except Exception as exc:
+                logger.warning("PA-API GetItems failed: %s", exc)
+                return None
+        if resp.status_code == 429 and attempt == 0:
+            rate_limiter.penalize("amazon_paapi", None, retry_after_header(resp.headers.get("Retry-After")))
+            continue
+        try:
+            data = resp.json()
+        except ValueError:
+            data = {}
+        if resp.status_code >= 400:
+            errors = data.get("Errors") or [{}]
+            logger.warning("PA-API GetItems returned %s: %s", resp.status_code, errors[0].get("Message") or errors[0].get("Code"))
+            return None
+        return data
+    return None
+
+
+async def fetch_items(asins: list[str], amazon_cfg: dict[str, Any], sink: list[DealInput]) -> list[str]:
+    # Returns the ASINs the API did not answer for, so the caller can fall back to the scraper for those.
+    _, _, marketplace = marketplace_for(amazon_cfg.get("region", "BR"))
+    budget = int(amazon_cfg.get("pa_api_max_requests", 30))
+    batches = [asins[i:i + MAX_ITEMS_PER_REQUEST] for i in range(0, len(asins), MAX_ITEMS_PER_REQUEST)]
+    overflow: list[str] = []
+    if len(batches) > budget:
+        logger.warning(
+            "PA-API budget of %s requests covers %s of %s ASINs; the rest go to the scraper",
+            budget,
+            budget * MAX_ITEMS_PER_REQUEST,
+            len(asins),
+        )
+        overflow = [asin for batch in batches[budget:] for asin in batch]
+        batches = batches[:budget]
+    missing: list[str] = []
+
+    async def run(batch: list[str]) -> None:
+        data = await _get_items(batch, amazon_cfg)
+        if data is None:
+            missing.extend(batch)
+            return
+        answered = set()
+        for item in (data.get("ItemsResult") or {}).get("Items") or []:
+            answered.add(item.get("ASIN"))
+            deal = _to_deal(item, marketplace)
+            if deal is not None:
+                sink.append(deal)
+        missing.extend(asin for asin in batch if asin not in answered)
+
+    await asyncio.gather(*(run(batch) for batch in batches))
+    return missing + overflow
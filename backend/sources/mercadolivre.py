@@ -1,58 +1,204 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Any
 
-import httpx
-
-from ..config import settings
+from ..concurrency import host_slot
+from ..db import db_read, db_write
+from ..http_cache import cached_get
+from ..http_client import http_clients
 from ..models import DealInput
+from ..utils import now_utc
 
 
 ML_API_BASE = "https://api.mercadolibre.com"
+ML_MAX_PAGE_SIZE = 50
+ML_MULTIGET_SIZE = 20
+ML_REFRESH_ATTRIBUTES = "id,price,original_price,status,available_quantity"
+
+
+def _to_deal(item: dict[str, Any]) -> DealInput:
+    return DealInput(
+        source="mercadolivre",
+        product_id=item.get("id") or item.get("catalog_product_id") or item.get("permalink", ""),
+        title=item.get("title", "Sem título"),
+        url=item.get("permalink", ""),
+        current_price=float(item.get("price") or 0),
+        old_price=float(item.get("original_price")) if item.get("original_price") else None,
+        seller_name=(item.get("seller") or {}).get("nickname"),
+        seller_reputation=((item.get("seller") or {}).get("seller_reputation") or {}).get("level_id"),
+        is_official_store=bool((item.get("official_store_id") or 0) > 0),
+        shipping_free=bool((item.get("shipping") or {}).get("free_shipping")),
+        sold_quantity=item.get("sold_quantity"),
+        condition=item.get("condition") or "new",
+        category=item.get("category_id"),
+        image_url=item.get("thumbnail"),
+        brand=((item.get("attributes") or [{}])[0] or {}).get("value_name"),
+        metadata={
+            "listing_type_id": item.get("listing_type_id"),
+            "available_quantity": int(item.get("available_quantity") or 0),
+            "catalog_product_id": item.get("catalog_product_id"),
+            "raw": item,
+        },
+    )
+
+
+def _fingerprint(item: dict[str, Any]) -> str:
+    return f"{item.get('id')}:{item.get('price')}"
+
+
+async def _search(params: dict, headers: dict) -> dict | None:
+    entry = await cached_get("mercadolivre", f"{ML_API_BASE}/sites/MLB/search", params, headers)
+    if entry is None:
+        return None
+    try:
+        return entry.json()
+    except ValueError:
+        return None
+
+
+async def fetch_items(ids: list[str], headers: dict) -> dict[str, dict]:
+    # Multi-get: one request per ML_MULTIGET_SIZE ids, trimmed to the fields a price refresh needs.
+    # Ids whose batch failed are missing from the result; ids the API reports on (404, closed) are present.
+    url = f"{ML_API_BASE}/items"
+    found: dict[str, dict] = {}
+
+    async def run(batch: list[str]) -> None:
+        async with host_slot(url):
+            try:
+                resp = await http_clients.get(url).get(
+                    url, params={"ids": ",".join(batch), "attributes": ML_REFRESH_ATTRIBUTES}, headers=headers
+                )
+                resp.raise_for_status()
+                entries = resp.json()
+            except Exception:
+                return
+        for entry, item_id in zip(entries, batch):
+            body = entry.get("body") or {}
+            found[body.get("id") or item_id] = body if entry.get("code") == 200 else {"status": "not_found"}
+
+    await asyncio.gather(*(run(ids[i:i + ML_MULTIGET_SIZE]) for i in range(0, len(ids), ML_MULTIGET_SIZE)))
+    return found
+
+
+def _load_cursor(conn, query_key: str) -> tuple[str | None, int]:
+    row = conn.execute(
+        "SELECT head_fingerprint, next_offset FROM crawl_cursors WHERE source='mercadolivre' AND query_key=?",
+        (query_key,),
+    ).fetchone()
+    return (row["head_fingerprint"], row["next_offset"]) if row else (None, 0)
+
+
+def _save_cursor(conn, query_key: str, head_fingerprint: str | None, next_offset: int) -> None:
+    conn.execute(
+        """
+        INSERT INTO crawl_cursors(source, query_key, next_offset, head_fingerprint, updated_at)
+        VALUES ('mercadolivre', ?, ?, ?, ?)
+        ON CONFLICT(source, query_key) DO UPDATE SET
+            next_offset=excluded.next_offset, head_fingerprint=excluded.head_fingerprint, updated_at=excluded.updated_at
+        """,
+        (query_key, next_offset, head_fingerprint, now_utc().isoformat()),
+    )
 
 
-async def fetch_mercadolivre_deals(config: dict[str, Any]) -> list[DealInput]:
+def _page_already_known(conn, results: list[dict]) -> bool:
+    wanted = {item.get("id"): item.get("price") for item in results if item.get("id")}
+    if not wanted or len(wanted) < len(results):
+        return False
+    marks = ",".join("?" * len(wanted))
+    rows = conn.execute(
+        f"SELECT product_id, current_price FROM deals WHERE source='mercadolivre' AND product_id IN ({marks})",
+        tuple(wanted),
+    ).fetchall()
+    known = {r["product_id"]: r["current_price"] for r in rows}
+    return all(pid in known and float(known[pid]) == float(price or 0) for pid, price in wanted.items())
+
+
+async def _crawl_query(
+    keyword: str,
+    category: str | None,
+    crawler_cfg: dict[str, Any],
+    headers: dict,
+    deals: list[DealInput],
+    persist: bool = True,
+) -> None:
+    query_key = f"{keyword}|{category or ''}"
+    page_size = max(1, min(ML_MAX_PAGE_SIZE, int(crawler_cfg.get("page_size", ML_MAX_PAGE_SIZE))))
+    max_offset = int(crawler_cfg.get("max_offset", 1000))
+    budget = int(crawler_cfg.get("max_pages", 5))
+    head_fp, next_offset = await db_read(_load_cursor, query_key)
+
+    async def walk(offset: int, stop_on_known: bool) -> tuple[int, bool, bool]:
+        nonlocal budget, new_head
+        while budget > 0 and offset < max_offset:
+            params = {"q": keyword, "limit": page_size, "offset": offset}
+            if category:
+                params["category"] = category
+            data = await _search(params, headers)
+            if data is None:
+                return offset, False, False
+            budget -= 1
+            results = data.get("results", [])
+            deals.extend(_to_deal(item) for item in results)
+            if offset == 0 and results:
+                new_head = _fingerprint(results[0])
+            offset += page_size
+            total = int((data.get("paging") or {}).get("total") or 0)
+            if len(results) < page_size or (total and offset >= total):
+                return offset, True, False
+            if stop_on_known and (head_fp in {_fingerprint(i) for i in results} or await db_read(_page_already_known, results)):
+                return offset, False, True
+        return offset, offset >= max_offset, False
+
+    # Walk from the top until we reach listings seen by an earlier scan, then spend
+    # the remaining page budget continuing the backfill where the last scan stopped.
+    new_head = head_fp
+    reached, exhausted, caught_up = await walk(0, stop_on_known=head_fp is not None)
+    if exhausted:
+        next_offset = max_offset
+    elif caught_up and next_offset > reached:
+        next_offset, exhausted, _ = await walk(next_offset, stop_on_known=False)
+        if exhausted:
+            next_offset = max_offset
+    else:
+        next_offset = max(next_offset, reached)
+    # A dry run (/sources/test) discards what it fetched, so moving the cursor would make
+    # the next real scan skip those listings as already seen.
+    if persist:
+        await db_write(_save_cursor, query_key, new_head, next_offset)
+
+
+def auth_headers(config: dict[str, Any]) -> dict:
+    token = config.get("mercadolivre", {}).get("access_token")
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+async def fetch_mercadolivre_deals(
+    config: dict[str, Any], sink: list[DealInput] | None = None, persist: bool = True
+) -> list[DealInput]:
     queries = config.get("seed_keywords", [])
     category_map = config.get("seed_categories", [])
     if not queries:
         queries = ["RTX 5060", "Tênis New Balance"]
 
-    headers = {}
-    token = config.get("mercadolivre", {}).get("access_token")
-    if token:
-        headers["Authorization"] = f"Bearer {token}"
-
-    deals: list[DealInput] = []
-    async with httpx.AsyncClient(timeout=settings.request_timeout_seconds) as client:
-        for q in queries[:5]:
-            params = {"q": q, "limit": 10}
-            if category_map:
-                params["category"] = category_map[0]
-            try:
-                resp = await client.get(f"{ML_API_BASE}/sites/MLB/search", params=params, headers=headers)
-                resp.raise_for_status()
-                data = resp.json()
-            except Exception:
-                continue
-            for item in data.get("results", []):
-                deals.append(
-                    DealInput(
-                        source="mercadolivre",
-                        product_id=item.get("id") or item.get("catalog_product_id") or item.get("permalink", ""),
-                        title=item.get("title", "Sem título"),
-                        url=item.get("permalink", ""),
-                        current_price=float(item.get("price") or 0),
-                        old_price=float(item.get("original_price")) if item.get("original_price") else None,
-                        seller_name=(item.get("seller") or {}).get("nickname"),
-                        seller_reputation=((item.get("seller") or {}).get("seller_reputation") or {}).get("level_id"),
-                        is_official_store=bool((item.get("official_store_id") or 0) > 0),
-                        shipping_free=bool((item.get("shipping") or {}).get("free_shipping")),
-                        sold_quantity=item.get("sold_quantity"),
-                        condition=item.get("condition") or "new",
-                        category=item.get("category_id"),
-                        image_url=item.get("thumbnail"),
-                        brand=((item.get("attributes") or [{}])[0] or {}).get("value_name"),
-                        metadata={"raw": item},
-                    )
-                )
+    headers = auth_headers(config)
+
+    deals: list[DealInput] = sink if sink is not None else []
+
+    crawler_cfg = config.get("crawler") or {}
+    if crawler_cfg.get("enabled"):
+        await asyncio.gather(
+            *(_crawl_query(q, category, crawler_cfg, headers, deals, persist) for q in queries for category in (category_map or [None]))
+        )
+        return deals
+
+    async def run(q: str) -> None:
+        params = {"q": q, "limit": 10}
+        if category_map:
+            params["category"] = category_map[0]
+        data = await _search(params, headers)
+        if data is not None:
+            deals.extend(_to_deal(item) for item in data.get("results", []))
+
+    await asyncio.gather(*(run(q) for q in queries[:5]))
     return deals
@@ -3,6 +3,7 @@ from __future__ import annotations
 import hashlib
 import json
 import re
+import unicodedata
 from datetime import datetime, timezone
 from typing import Any
 
@@ -23,8 +24,17 @@ def normalize_price(value: Any) -> float | None:
         return None
 
 
+COMBINING_MARKS_RE = re.compile(r"[\u0300-\u036f]")
+
+
+def fold_accents(text: str) -> str:
+    if text.isascii():
+        return text
+    return COMBINING_MARKS_RE.sub("", unicodedata.normalize("NFKD", text))
+
+
 def slugify_text(text: str) -> str:
-    text = text.lower().strip()
+    text = fold_accents(text).lower().strip()
     text = re.sub(r"[^a-z0-9 ]+", " ", text)
     text = re.sub(r"\s+", " ", text)
     return text
@@ -35,6 +45,12 @@ def similarity_key(title: str, brand: str | None, model: str | None) -> str:
     return hashlib.sha1(base.encode("utf-8")).hexdigest()
 
 
+def fts_match_query(text: str) -> str | None:
+    # Quote every token so user input can never be parsed as FTS5 syntax; prefix-match each one.
+    tokens = slugify_text(text).split()
+    return " ".join(f'"{token}"*' for token in tokens) or None
+
+
 def json_dump(data: Any) -> str:
     return json.dumps(data, ensure_ascii=False)
 
@@ -2,6 +2,7 @@ import React, { useMemo, useState } from 'react'
 import { createRoot } from 'react-dom/client'
 
 const API = import.meta.env.VITE_API_URL || 'http://localhost:8000'
+const DEALS_URL = `${API}/deals?fields=source,title,current_price,score,status`
 
 function App() {
   const [token, setToken] = useState(localStorage.getItem('token') || '')
@@ -9,6 +10,7 @@ function App() {
   const [password, setPassword] = useState('admin123')
   const [config, setConfig] = useState(null)
   const [deals, setDeals] = useState([])
+  const [dealsCursor, setDealsCursor] = useState(null)
   const [runs, setRuns] = useState([])
 
   const authHeaders = useMemo(() => ({ Authorization: `Bearer ${token}` }), [token])
@@ -31,14 +33,22 @@ function App() {
     const headers = { Authorization: `Bearer ${currentToken}` }
     const [c, d, r] = await Promise.all([
       fetch(`${API}/config`, { headers }),
-      fetch(`${API}/deals`, { headers }),
-      fetch(`${API}/runs`, { headers }),
+      fetch(DEALS_URL, { headers }),
+      fetch(`${API}/runs?limit=20`, { headers }),
     ])
     setConfig(await c.json())
     setDeals(await d.json())
+    setDealsCursor(d.headers.get('X-Next-Cursor'))
     setRuns(await r.json())
   }
 
+  async function loadMoreDeals() {
+    const d = await fetch(`${DEALS_URL}&cursor=${encodeURIComponent(dealsCursor)}`, { headers: authHeaders })
+    const page = await d.json()
+    setDeals(current => [...current, ...page])
+    setDealsCursor(d.headers.get('X-Next-Cursor'))
+  }
+
   async function saveConfig() {
     await fetch(`${API}/config`, {
       method: 'PUT',
@@ -84,7 +94,7 @@ function App() {
           <input type="number" value={config.approval_threshold} onChange={e => setConfig({ ...config, approval_threshold: Number(e.target.value) })} />
           <label>Keywords (linha por linha): </label>
           <textarea value={config.seed_keywords.join('\n')} onChange={e => setConfig({ ...config, seed_keywords: e.target.value.split('\n').map(v => v.trim()).filter(Boolean) })} rows={4} cols={40} />
-          <label>Amazon links (linha por linha): </label>
+          <label>Amazon links ou ASINs (linha por linha): </label>
           <textarea value={(config.amazon?.manual_links || []).join('\n')} onChange={e => setConfig({ ...config, amazon: { ...config.amazon, manual_links: e.target.value.split('\n').map(v => v.trim()).filter(Boolean) } })} rows={4} cols={40} />
           <label>Telegram Bot Token: </label>
           <input value={config.telegram.bot_token} onChange={e => setConfig({ ...config, telegram: { ...config.telegram, bot_token: e.target.value } })} />
@@ -104,6 +114,7 @@ function App() {
             {deals.map(d => <tr key={d.id}><td>{d.id}</td><td>{d.source}</td><td>{d.title}</td><td>{d.current_price}</td><td>{d.score}</td><td>{d.status}</td><td><button onClick={() => approve(d.id)}>Aprovar+Postar</button><button onClick={() => reject(d.id)}>Rejeitar</button></td></tr>)}
           </tbody>
         </table>
+        {dealsCursor && <button onClick={loadMoreDeals}>Carregar mais</button>}
       </section>
 
       <section>
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+
+from backend import collector, main
+from backend.benchmarks.ingest import synthetic_deals
+from backend.config import settings
+from backend.db import close_pool, init_db
+from backend.dedup import near_duplicates
+
+SCAN_ROWS = 5_000
+MAX_HEALTH_SECONDS = 0.5
+PROBE_INTERVAL = 0.005
+
+
+async def _probe_health(client: httpx.AsyncClient, stop: asyncio.Event) -> list[float]:
+    # Each sample spans the pause and the request: a scan that blocks the event loop can stall
+    # either one, and only the pause if it lands between requests.
+    samples = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        (await client.get("/health")).raise_for_status()
+        samples.append(time.perf_counter() - start - PROBE_INTERVAL)
+    return samples
+
+
+async def _health_during_scan() -> tuple[dict, float, list[float]]:
+    stop = asyncio.Event()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        probe = asyncio.create_task(_probe_health(client, stop))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        stats = await main.collect_and_process()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        samples = await probe
+    return stats, elapsed, samples
+
+
+def test_health_stays_flat_while_a_scan_ingests(tmp_path, monkeypatch):
+    batch = synthetic_deals(SCAN_ROWS)
+
+    async def source(config, sink, persist=True):
+        sink.extend(batch)
+        return sink
+
+    monkeypatch.setattr(settings, "db_path", str(tmp_path / "health.db"))
+    monkeypatch.setattr(collector, "SOURCES", {"synthetic": source})
+    init_db()
+    near_duplicates.reset()
+    try:
+        stats, elapsed, samples = asyncio.run(_health_during_scan())
+    finally:
+        near_duplicates.reset()
+        close_pool()
+
+    assert stats["new"] > SCAN_ROWS // 2
+    assert elapsed > MAX_HEALTH_SECONDS
+    ordered = sorted(samples)
+    assert ordered[-1] < MAX_HEALTH_SECONDS
+    assert ordered[int(len(ordered) * 0.99) - 1] < MAX_HEALTH_SECONDS / 2
+    assert len(samples) > elapsed / MAX_HEALTH_SECONDS